@@ -24,7 +24,8 @@
 import logging
 import os
 import json
-from collections import defaultdict
+import threading
+from collections import defaultdict, OrderedDict
 from datetime import datetime
 from logging.config import dictConfig
 from typing import Optional, List
@@ -62,8 +63,21 @@ DEFAULT_USE_RESTRICTIONS_ICONS = {
 
 ldap.set_option(ldap.OPT_X_TLS_REQUIRE_CERT, ldap.OPT_X_TLS_NEVER)
 
+# REMS access handlers by entity type, user and index generation, see get_access_handler
+DEFAULT_ACCESS_HANDLERS_CACHE_SIZE = 1000
+_access_handlers = OrderedDict()
+_access_handlers_lock = threading.Lock()
+
 
 def get_access_handler(user, entity_name):
+    """
+    Access handler of an entity type for a user, as configured by ACCESS_HANDLERS or CUSTOM_ACCESS_HANDLERS
+    The REMS handlers are kept in memory per user until the next commit of the index,
+    building them requires the ids of all the entities and the creation of the user in REMS.
+    @param user: the current user
+    @param entity_name: name of the entity type, e.g. dataset
+    @return: an AccessHandler instance or None
+    """
     custom_handler_map = app.config.get("CUSTOM_ACCESS_HANDLERS", {})
     if entity_name in custom_handler_map:
         custom_handler_string_class = custom_handler_map[entity_name]
@@ -90,10 +104,23 @@ def get_access_handler(user, entity_name):
             raise ValueError("Unknown access handler")
         if user.is_authenticated:
             user_rems_id = user.id
+            user_key = (user.id, user.displayname, user.email)
         else:
             user_rems_id = "data-catalogue-service"
-        all_ids = app.config["entities"][entity_name].query.all_ids()
-        return rems_class(
+            user_key = (user_rems_id,)
+        # the ids change with the index, the handler is rebuilt after a commit
+        generation = app.config["_solr_orm"].generation.current()
+        cache_key = (entity_name, access_handler_string, user_key, generation)
+        with _access_handlers_lock:
+            handler = _access_handlers.get(cache_key)
+            if handler is not None:
+                _access_handlers.move_to_end(cache_key)
+        if handler is not None:
+            if user.is_authenticated:
+                handler.ensure_rems_user(user)
+            return handler
+        all_ids = app.config["entities"][entity_name].query.all_ids_set()
+        handler = rems_class(
             user,
             api_username=user_rems_id,
             api_key=app.config.get("REMS_API_KEY"),
@@ -103,6 +130,13 @@ def get_access_handler(user, entity_name):
             verify_ssl=app.config.get("REMS_VERIFY_SSL", True),
             all_ids=all_ids,
         )
+        with _access_handlers_lock:
+            _access_handlers[cache_key] = handler
+            while len(_access_handlers) > app.config.get(
+                "ACCESS_HANDLERS_CACHE_SIZE", DEFAULT_ACCESS_HANDLERS_CACHE_SIZE
+            ):
+                _access_handlers.popitem(last=False)
+        return handler
     if access_handler_string == "Email":
         from .acces_handler.email_handler import EmailAccessHandler
 
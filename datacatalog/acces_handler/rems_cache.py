@@ -0,0 +1,106 @@
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+    datacatalog.acces_handler.rems_cache
+    -------------------
+
+   In memory caches of the data retrieved from REMS, shared by the access handlers of the process:
+     - TTLCache: bounded cache whose entries expire after a timeout
+     - applications_states: state of the applications of each user of each REMS host, by resource id
+     - rems_metadata: catalogue items, resources with their licenses and forms
+     - form_classes: access request forms classes built from the REMS forms
+
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from .. import app
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 1000
+
+
+class TTLCache(object):
+    """
+    Thread safe cache keeping at most max_size entries, the least recently used ones are evicted first
+    """
+
+    def __init__(self, timeout: float, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """
+        Initialize a TTLCache instance
+        @param timeout: number of seconds an entry is valid
+        @param max_size: maximum number of entries
+        """
+        self.timeout = timeout
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Value of a key if it is still valid
+        @param key: the key
+        @param default: value returned if the key is missing or expired
+        @return: the cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if time.monotonic() - entry[0] >= self.timeout:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# {resource id: ApplicationState} per REMS host and user id, see RemsAccessHandler.get_applications_states
+applications_states = TTLCache(
+    app.config.get("REMS_APPLICATIONS_CACHE_TIMEOUT", 300),
+    app.config.get("REMS_APPLICATIONS_CACHE_SIZE", DEFAULT_MAX_SIZE),
+)
+
+# catalogue items, resources and forms by REMS host, type and id, see RemsAccessHandler._get_rems_metadata
+rems_metadata = TTLCache(
+    app.config.get("REMS_METADATA_CACHE_TIMEOUT", 600),
+    app.config.get("REMS_METADATA_CACHE_SIZE", DEFAULT_MAX_SIZE),
+)
+
+# FlaskForm classes by form, licenses and use restrictions, expiring with the metadata they are built from
+form_classes = TTLCache(
+    app.config.get("REMS_METADATA_CACHE_TIMEOUT", 600),
+    app.config.get("REMS_METADATA_CACHE_SIZE", DEFAULT_MAX_SIZE),
+)
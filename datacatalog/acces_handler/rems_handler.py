@@ -12,15 +12,19 @@
 #  GNU Affero General Public License for more details.
 #  You should have received a copy of the GNU Affero General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import functools
+import hashlib
+import json
 import logging
 import os
 import tempfile
 from abc import ABCMeta, abstractmethod
 
-from flask import request
+from flask import request, session, has_request_context
 from flask_login import current_user
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileAllowed
+from remsclient.rest import ApiException
 from wtforms import (
     StringField,
     TextAreaField,
@@ -35,6 +39,7 @@ from wtforms.validators import DataRequired, Length, Email, AnyOf, Optional
 
 from .access_handler import AccessHandler, ApplicationState, Application
 from .email_handler import EmailAccessHandler
+from .rems_cache import applications_states, rems_metadata, form_classes
 from .. import app
 from ..connector.rems_connector import RemsConnector, CatalogueItemDoesntExistException
 from ..exceptions import CouldNotCloseApplicationException
@@ -42,6 +47,9 @@ from ..forms import MultiCheckboxField
 
 logger = logging.getLogger(__name__)
 
+# session key of the details of the user last created in REMS, see ensure_rems_user
+REMS_USER_SESSION_KEY = "rems_user"
+
 
 class RemsAccessHandler(AccessHandler):
     ALLOW_USER_ACTIONS = False
@@ -82,12 +90,26 @@ class RemsAccessHandler(AccessHandler):
         )
         # trying to create user in case it doesn't exist
         if user.is_authenticated:
-            logger.debug("User is authenticated, will create rems user")
-            self.rems_connector.create_user(api_username, user.displayname, user.email)
+            self.ensure_rems_user(user)
         super().__init__(user)
         self.fallback_handler = EmailAccessHandler(user)
         self.template = "request_access_rems.html"
 
+    def ensure_rems_user(self, user):
+        """
+        Create or update the user in REMS, only once per session unless the user details change
+        @param user: the authenticated user
+        """
+        details = [self.api_username, user.displayname, user.email]
+        if has_request_context() and session.get(REMS_USER_SESSION_KEY) == details:
+            return
+        logger.debug("User is authenticated, will create rems user")
+        self.rems_connector.create_user(self.api_username, user.displayname, user.email)
+        # new login, the applications may have changed in REMS
+        applications_states.pop(self._get_applications_states_key())
+        if has_request_context():
+            session[REMS_USER_SESSION_KEY] = details
+
     def has_access(self, dataset):
         logger.info(
             "Checking if user %s has access to dataset %s",
@@ -97,26 +119,65 @@ class RemsAccessHandler(AccessHandler):
         if not dataset.e2e:
             logger.info("e2e flow not enabled for dataset %s, no access", dataset.id)
             return False
-        applications = self.rems_connector.applications(f'resource:"{dataset.id}"')
-        has_submitted = False
-        if not applications:
+        state = self.get_applications_states().get(dataset.id)
+        if state is None:
             return False
+        logger.info(
+            "application found for user %s, %s state", self.api_username, state.value
+        )
+        return state
+
+    def _get_applications_states_key(self):
+        """
+        The same user may have applications on several REMS hosts, e.g. one per entity type
+        @return: key of the applications states of the user in the cache
+        """
+        return self.rems_connector.rems_configuration.host, self.api_username
+
+    def get_applications_states(self):
+        """
+        States of the applications of the user by resource id, loaded with a single REMS call
+        and kept in memory for REMS_APPLICATIONS_CACHE_TIMEOUT seconds (default 300)
+        @return: dict of resources ids and ApplicationState, approved or submitted
+        """
+        states = applications_states.get(self._get_applications_states_key())
+        if states is None:
+            try:
+                applications = self.rems_connector.my_applications(raise_errors=True)
+            except ApiException as e:
+                # not cached, the next check tries again
+                logger.error(
+                    "could not retrieve the applications of user %s",
+                    self.api_username,
+                    exc_info=e,
+                )
+                return {}
+            states = self.cache_applications_states(applications)
+        return states
+
+    def cache_applications_states(self, applications):
+        """
+        Index the approved and submitted applications of the user by resource id and cache the result
+        @param applications: the applications of the user as returned by RemsConnector.my_applications
+        @return: dict of resources ids and ApplicationState
+        """
+        states = {}
         for application in applications:
             if application.applicationapplicant["userid"] != self.api_username:
                 continue
-            if application.applicationstate[18:] == ApplicationState.approved.value:
-                logger.info(
-                    "application found for user %s, approved state", self.api_username
-                )
-                return ApplicationState.approved
-            if application.applicationstate[18:] == ApplicationState.submitted.value:
-                has_submitted = True
-        if has_submitted:
-            logger.info(
-                "application found for user %s, submitted state", self.api_username
-            )
-            return ApplicationState.submitted
-        return False
+            state = application.applicationstate[18:]
+            if state == ApplicationState.approved.value:
+                state = ApplicationState.approved
+            elif state == ApplicationState.submitted.value:
+                state = ApplicationState.submitted
+            else:
+                continue
+            for resource in application.applicationresources:
+                # an approved application wins over a submitted one
+                if states.get(resource.resourceext_id) is not ApplicationState.approved:
+                    states[resource.resourceext_id] = state
+        applications_states.set(self._get_applications_states_key(), states)
+        return states
 
     def close_application(self, application_id):
         logger.info(
@@ -128,11 +189,17 @@ class RemsAccessHandler(AccessHandler):
         if application.applicant_id != current_user.id:
             raise CouldNotCloseApplicationException("not authorized")
         self.rems_connector.close_application(application_id)
+        applications_states.pop(self._get_applications_states_key())
         return True
 
     def my_applications(self):
         logger.debug("getting list of applications")
-        applications = self.rems_connector.my_applications()
+        try:
+            applications = self.rems_connector.my_applications(raise_errors=True)
+        except ApiException as e:
+            logger.error("could not retrieve the applications", exc_info=e)
+            return []
+        self.cache_applications_states(applications)
         results = []
         for a in applications:
             if a.applicationstate[18:] != ApplicationState.draft.value and (
@@ -151,10 +218,8 @@ class RemsAccessHandler(AccessHandler):
             self.fallback_handler.apply(dataset, form)
             return
 
-        catalogue_item = self.rems_connector.get_catalogue_item(dataset.id)
-        rems_form = self.rems_connector.get_form_for_catalogue_item(
-            catalogue_item.formid
-        )
+        catalogue_item = self.get_catalogue_item(dataset.id)
+        rems_form = self.get_form(catalogue_item.formid)
         field_values = {}
         # create application
         application_id = self.rems_connector.create_application([catalogue_item.id])
@@ -170,7 +235,7 @@ class RemsAccessHandler(AccessHandler):
             application_id, rems_form.formid, field_values
         )
         resource_id = catalogue_item.resource_id
-        resource = self.rems_connector.get_resource(resource_id)
+        resource = self.get_resource(resource_id)
         licenses = resource.licenses
         license_ids = []
         for license in licenses:
@@ -178,28 +243,86 @@ class RemsAccessHandler(AccessHandler):
             license_ids.append(license_id)
         self.rems_connector.accept_license(application_id, license_ids)
         self.rems_connector.submit_application(application_id)
+        applications_states.pop(self._get_applications_states_key())
 
     def get_datasets(self):
         pass
 
-    def create_form(self, dataset, form_data):
-        class FormClass(FlaskForm):
-            pass
+    def get_catalogue_item(self, dataset_id):
+        return self._get_rems_metadata(
+            "catalogue_item", dataset_id, self.rems_connector.get_catalogue_item
+        )
 
+    def get_resource(self, resource_id):
+        return self._get_rems_metadata(
+            "resource", resource_id, self.rems_connector.get_resource
+        )
+
+    def get_form(self, form_id):
+        return self._get_rems_metadata(
+            "form", form_id, self.rems_connector.get_form_for_catalogue_item
+        )
+
+    def _get_rems_metadata(self, kind, key, load):
+        """
+        Catalogue items, resources (with their licenses) and forms are the same for all the users,
+        they are kept in memory for REMS_METADATA_CACHE_TIMEOUT seconds (default 600)
+        @param kind: type of the metadata, part of the cache key
+        @param key: id of the metadata
+        @param load: function retrieving the metadata from REMS
+        @return: the metadata
+        """
+        cache_key = (self.rems_connector.rems_configuration.host, kind, key)
+        value = rems_metadata.get(cache_key)
+        if value is None:
+            value = load(key)
+            rems_metadata.set(cache_key, value)
+        return value
+
+    def create_form(self, dataset, form_data):
         logger.debug("Creating form for rems request for dataset %s", dataset.id)
         if not dataset.e2e:
             logger.debug("e2e not enabled for this dataset, fallback to email form")
             return self.fallback_handler.create_form(dataset, form_data)
 
         try:
-            catalogue_item = self.rems_connector.get_catalogue_item(dataset.id)
+            catalogue_item = self.get_catalogue_item(dataset.id)
         except CatalogueItemDoesntExistException as e:
             logger.error(e)
             return None
         resource_id = catalogue_item.resource_id
-        resource = self.rems_connector.get_resource(resource_id)
+        resource = self.get_resource(resource_id)
+        use_restrictions = dataset.use_restrictions or []
+        # the form class only depends on the REMS form, the licenses and the use restrictions
+        use_restrictions_hash = hashlib.sha1(
+            json.dumps(use_restrictions, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        cache_key = (
+            self.rems_connector.rems_configuration.host,
+            catalogue_item.formid,
+            tuple(license.id for license in resource.licenses),
+            use_restrictions_hash,
+        )
+        form_class = form_classes.get(cache_key)
+        if form_class is None:
+            form = self.get_form(catalogue_item.formid)
+            form_class = self.build_form_class(form, resource, use_restrictions)
+            form_classes.set(cache_key, form_class)
+        return form_class(form_data)
+
+    @staticmethod
+    def build_form_class(form, resource, use_restrictions):
+        """
+        Build the FlaskForm subclass of an access request, the data of the request are bound by instantiating it
+        @param form: the REMS form
+        @param resource: the REMS resource, holding the licenses to accept
+        @param use_restrictions: use restrictions of the dataset to accept
+        @return: the FormClass class
+        """
+
+        class FormClass(FlaskForm):
+            pass
 
-        form = self.rems_connector.get_form_for_catalogue_item(catalogue_item.formid)
         fields = form.formfields
         for field in fields:
             try:
@@ -224,7 +347,6 @@ class RemsAccessHandler(AccessHandler):
             )
             field_id = f"license_{license_id}"
             setattr(FormClass, field_id, license_field)
-        use_restrictions = dataset.use_restrictions or []
         logger.debug(
             "processing use restrictions, %d restrictions", len(use_restrictions)
         )
@@ -267,7 +389,7 @@ class RemsAccessHandler(AccessHandler):
                 ),
             )
         setattr(FormClass, "submit", SubmitField("Send"))
-        return FormClass(form_data)
+        return FormClass
 
     @staticmethod
     def build_application(application):
@@ -303,6 +425,19 @@ def get_all_subclasses(cls):
     return all_subclasses
 
 
+@functools.lru_cache(maxsize=None)
+def get_field_builders():
+    """
+    FieldBuilder subclasses, looked up once as all of them are defined at import time
+    @return: tuple of the subclasses, one per class name
+    """
+    types_named = {
+        field_builder.__name__: field_builder
+        for field_builder in get_all_subclasses(FieldBuilder)
+    }
+    return tuple(types_named.values())
+
+
 class UnsupportedFieldType(Exception):
     pass
 
@@ -312,11 +447,7 @@ class FieldBuilder(metaclass=ABCMeta):
 
     @staticmethod
     def build_field_builder(rems_field):
-        field_builders = get_all_subclasses(FieldBuilder)
-        types_named = {
-            field_builder.__name__: field_builder for field_builder in field_builders
-        }
-        for field_builder in types_named.values():
+        for field_builder in get_field_builders():
             if field_builder.can_handle(rems_field):
                 fb = field_builder(rems_field)
                 return fb
@@ -30,6 +30,7 @@ from ldap.ldapobject import LDAPObject
 from . import UserPasswordAuthentication
 from .. import app, ldap
 from ..exceptions import AuthenticationException
+from ..metrics import track
 
 __author__ = "Kavita Rege"
 
@@ -85,7 +86,8 @@ class LDAPUserPasswordAuthentication(UserPasswordAuthentication):
         try:
             conn = self.get_ldap_connection()
             member = "uid={},cn=users,cn=accounts,dc=uni,dc=lu".format(username)
-            conn.simple_bind_s(member, password)
+            with track("ldap", "bind"):
+                conn.simple_bind_s(member, password)
 
             group_filter = app.config.get("LDAP_USER_GROUPS_FIELD")
             if group_filter:
@@ -96,9 +98,10 @@ class LDAPUserPasswordAuthentication(UserPasswordAuthentication):
                 )
             else:
                 search_filter = "(member={})".format(member)
-            results = conn.search_s(
-                app.config.get("LDAP_BASE_DN"), ldap.SCOPE_SUBTREE, search_filter
-            )
+            with track("ldap", "search"):
+                results = conn.search_s(
+                    app.config.get("LDAP_BASE_DN"), ldap.SCOPE_SUBTREE, search_filter
+                )
             try:
                 members = results[0][1]["member"]
                 if member.encode("UTF8") in members:
@@ -139,12 +142,13 @@ class LDAPUserPasswordAuthentication(UserPasswordAuthentication):
         @param attributes: list of attributes to retrieve
         @return: the list of attributes values
         """
-        result = ad_conn.search_s(
-            dn,
-            ldap.SCOPE_SUBTREE,
-            "(&(objectClass=person)(uid={}))".format(uid),
-            attrlist=attributes,
-        )
+        with track("ldap", "get_attributes"):
+            result = ad_conn.search_s(
+                dn,
+                ldap.SCOPE_SUBTREE,
+                "(&(objectClass=person)(uid={}))".format(uid),
+                attrlist=attributes,
+            )
         results = {}
         if not result:
             # return None if user not found
@@ -0,0 +1,166 @@
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+    datacatalog.cache_tags
+    -------------------
+
+   Tagged pages cache built on top of app.cache
+   Each cached page declares the tags it depends on, e.g. the entity type and the entity id it displays.
+   Every tag has a version stored in the cache and the versions are part of the page key,
+   invalidating a tag changes its version so that the pages depending on it are not found anymore.
+   Tags only known while rendering, e.g. the linked entities displayed, are added with add_page_tags,
+   their versions are stored with the page and checked when it is read.
+   Works with any cache backend, the orphan pages are evicted by the backend.
+
+"""
+import functools
+import hashlib
+import logging
+import uuid
+from typing import Callable, Iterable, List
+
+from flask import g, has_request_context, request
+
+from . import app
+
+logger = logging.getLogger(__name__)
+
+TAG_KEY_PREFIX = "tag/"
+
+
+def entity_tags(entity_name: str, entity_id: str = None) -> List[str]:
+    """
+    Tags of a page depending on an entity type and optionally on a single entity
+    Pages listing entities (search, slugs) also depend on the list tag of the type
+    @param entity_name: name of the entity type, e.g. dataset
+    @param entity_id: id of the entity displayed by the page
+    @return: list of tags
+    """
+    if entity_id is None:
+        return [entity_name, f"{entity_name}:list"]
+    return [entity_name, f"{entity_name}:{entity_id}"]
+
+
+def linked_entities_tags(entities: Iterable) -> List[str]:
+    """
+    Tags of the linked entities displayed by a page, e.g. the study and the project of a dataset
+    @param entities: SolrEntity instances
+    @return: list of tags
+    """
+    return sorted(
+        {f"{type(entity).__name__.lower()}:{entity.id}" for entity in entities}
+    )
+
+
+def add_page_tags(tags: Iterable[str]) -> None:
+    """
+    Add tags to the page being rendered by a view decorated with cached_page
+    @param tags: tags the page depends on, in addition to the ones of the decorator
+    """
+    if has_request_context() and "page_tags" in g:
+        g.page_tags.extend(tags)
+
+
+def _new_version() -> str:
+    return uuid.uuid4().hex
+
+
+def get_tags_versions(tags: List[str]) -> List[str]:
+    """
+    Current versions of some tags, retrieved with a single cache request
+    Tags without version, never invalidated or evicted from the cache, get a new one
+    @param tags: list of tags
+    @return: list of versions in the same order
+    """
+    keys = [TAG_KEY_PREFIX + tag for tag in tags]
+    versions = list(app.cache.get_many(*keys))
+    missing = {}
+    for index, version in enumerate(versions):
+        if version is None:
+            versions[index] = _new_version()
+            missing[keys[index]] = versions[index]
+    if missing:
+        app.cache.set_many(missing, timeout=0)
+    return versions
+
+
+def invalidate_tags(tags: Iterable[str]) -> None:
+    """
+    Invalidate all the cached pages depending on one of the tags
+    @param tags: tags to invalidate
+    """
+    versions = {TAG_KEY_PREFIX + tag: _new_version() for tag in tags}
+    if versions:
+        logger.debug("invalidating cache tags %s", ", ".join(versions))
+        app.cache.set_many(versions, timeout=0)
+
+
+def invalidate_entities(entity_name: str, entity_ids: Iterable[str] = None) -> None:
+    """
+    Invalidate the cached pages of an entity type, or only the pages of some entities of this type
+    and the pages listing entities of this type
+    @param entity_name: name of the entity type, e.g. dataset
+    @param entity_ids: ids of the modified entities, all the pages of the type are invalidated if None
+    """
+    if entity_ids is None:
+        invalidate_tags([entity_name])
+    else:
+        invalidate_tags(
+            [f"{entity_name}:list"]
+            + [f"{entity_name}:{entity_id}" for entity_id in entity_ids]
+        )
+
+
+def cached_page(tags: Callable[..., List[str]] = None, query_string: bool = False):
+    """
+    Decorator caching the response of a view until one of its tags, or of the tags added by the view
+    with add_page_tags, is invalidated
+    @param tags: function receiving the view arguments and returning the tags of the page,
+     the page is only invalidated by a full cache clear if None
+    @param query_string: if true, the query string is part of the cache key
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def decorated_view(*args, **kwargs):
+            page_tags = tags(*args, **kwargs) if tags else []
+            cache_key = "view/" + request.path
+            if query_string:
+                args_as_sorted_tuple = tuple(
+                    sorted(pair for pair in request.args.items(multi=True))
+                )
+                cache_key += hashlib.md5(str(args_as_sorted_tuple).encode()).hexdigest()
+            if page_tags:
+                cache_key += "/" + "/".join(get_tags_versions(page_tags))
+            cached = app.cache.get(cache_key)
+            if cached is not None:
+                response, extra_tags, extra_versions = cached
+                if not extra_tags or get_tags_versions(extra_tags) == extra_versions:
+                    return response
+            g.page_tags = []
+            try:
+                response = view(*args, **kwargs)
+                extra_tags = sorted(set(g.page_tags))
+            finally:
+                g.pop("page_tags", None)
+            extra_versions = get_tags_versions(extra_tags) if extra_tags else []
+            app.cache.set(cache_key, (response, extra_tags, extra_versions), timeout=0)
+            return response
+
+        return decorated_view
+
+    return decorator
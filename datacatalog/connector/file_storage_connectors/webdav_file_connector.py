@@ -31,6 +31,7 @@ from typing import Optional
 from xml.etree import ElementTree
 from datetime import datetime
 from .file_storage_connector import FileStorageConnector
+from ...metrics import track
 
 __author__ = "Francois Ancien"
 
@@ -47,7 +48,8 @@ class WebdavFileStorageConnector(FileStorageConnector):
         Parameters:
             folder: The folder to list files from. (default: folder from
         """
-        response = requests.request("PROPFIND", folder, headers={"Depth": "1"})
+        with track("webdav", "list_files"):
+            response = requests.request("PROPFIND", folder, headers={"Depth": "1"})
 
         if response.ok:
             return self.parse_webdav_response(response.content, folder)
@@ -66,9 +68,10 @@ class WebdavFileStorageConnector(FileStorageConnector):
             bool: True if folder was found, else False
         """
         try:
-            response = requests.head(
-                folder, allow_redirects=True, timeout=self.FOLDER_CHECK_TIMEOUT
-            )
+            with track("webdav", "folder_exists"):
+                response = requests.head(
+                    folder, allow_redirects=True, timeout=self.FOLDER_CHECK_TIMEOUT
+                )
         except ConnectTimeout as e:
             logger.error(e)
             return False
@@ -16,6 +16,7 @@
 #   along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
+import threading
 from typing import List
 
 import remsclient
@@ -25,6 +26,7 @@ from remsclient.rest import ApiException
 
 from .entities_connector import ExportEntitiesConnector
 from .. import app
+from ..metrics import timed
 from ..exceptions import (
     CouldNotCloseApplicationException,
     CouldNotSubmitApplicationException,
@@ -33,6 +35,10 @@ from ..solr.solr_orm_entity import SolrEntity
 
 logger = logging.getLogger(__name__)
 
+# api clients by host, api key and ssl verification, see get_rems_client
+_rems_clients = {}
+_rems_clients_lock = threading.Lock()
+
 
 class UserDoesntExistException(Exception):
     pass
@@ -42,6 +48,29 @@ class CatalogueItemDoesntExistException(Exception):
     pass
 
 
+def get_rems_client(host, api_key, verify_ssl=True) -> remsclient.ApiClient:
+    """
+    REMS api client shared by all the connectors using the same host, api key and ssl verification
+    so that they share its connections pool.
+    Its configuration holds no user, the user is sent with each call, see RemsConnector.authentication_kwargs
+    @param host: url of the REMS api
+    @param api_key: REMS api key
+    @param verify_ssl: verify the certificate of the REMS server
+    @return: the remsclient.ApiClient instance, created on first use
+    """
+    key = (host, api_key, verify_ssl)
+    with _rems_clients_lock:
+        client = _rems_clients.get(key)
+        if client is None:
+            configuration = remsclient.Configuration()
+            configuration.api_key = api_key
+            configuration.verify_ssl = verify_ssl
+            configuration.host = host
+            client = remsclient.ApiClient(configuration=configuration)
+            _rems_clients[key] = client
+        return client
+
+
 class RemsConnector(ExportEntitiesConnector):
     def __init__(
         self,
@@ -60,7 +89,7 @@ class RemsConnector(ExportEntitiesConnector):
         self.rems_configuration.api_username = api_username
         self.rems_configuration.verify_ssl = verify_ssl
         self.rems_configuration.host = host
-        self.rems_client = remsclient.ApiClient(configuration=self.rems_configuration)
+        self.rems_client = get_rems_client(host, api_key, verify_ssl)
         self.authentication_kwargs = {
             "x_rems_api_key": self.rems_configuration.api_key,
             "x_rems_user_id": self.rems_configuration.api_username,
@@ -77,6 +106,7 @@ class RemsConnector(ExportEntitiesConnector):
         self.organization_id = organization_id
         self.licenses = licenses
 
+    @timed("rems")
     def create_application(self, items):
         logger.info(
             "Creating Rems application for items %s", ",".join([str(i) for i in items])
@@ -89,6 +119,7 @@ class RemsConnector(ExportEntitiesConnector):
         logger.info("Application with id %s created ", response.application_id)
         return response.application_id
 
+    @timed("rems")
     def save_application_draft(self, application_id, form_id, fields):
         logger.info("Saving application %s as draft", application_id)
         rems_applications = remsclient.ApplicationsApi(self.rems_client)
@@ -112,6 +143,7 @@ class RemsConnector(ExportEntitiesConnector):
             logger.info("Application was not saved")
         return success
 
+    @timed("rems")
     def export_entities(self, entities: List[SolrEntity]):
         logger.info("Exporting entities to REMS")
         resource_ids = self.load_resources()
@@ -193,6 +225,7 @@ class RemsConnector(ExportEntitiesConnector):
             )
         return count
 
+    @timed("rems")
     def load_resources(self):
         logger.debug("retrieving all resources from rems")
         rems_resources = remsclient.ResourcesApi(self.rems_client)
@@ -206,6 +239,7 @@ class RemsConnector(ExportEntitiesConnector):
         logger.debug("%d resources found", len(resources_ids))
         return resources_ids
 
+    @timed("rems")
     def get_catalogue_item(self, dataset_id):
         logger.debug("getting catalogue item for dataset %s", dataset_id)
         rems_catalogue = remsclient.CatalogueItemsApi(self.rems_client)
@@ -218,6 +252,7 @@ class RemsConnector(ExportEntitiesConnector):
             raise CatalogueItemDoesntExistException(message)
         return items[0]
 
+    @timed("rems")
     def get_resource(self, resource_id):
         logger.debug("getting resource for resource_id %s", resource_id)
         rems_resource = remsclient.ResourcesApi(self.rems_client)
@@ -226,6 +261,7 @@ class RemsConnector(ExportEntitiesConnector):
         )
         return resource
 
+    @timed("rems")
     def get_form_for_catalogue_item(self, form_id):
         logger.debug("getting form for form id %s", form_id)
         api_instance = remsclient.FormsApi(self.rems_client)
@@ -233,6 +269,7 @@ class RemsConnector(ExportEntitiesConnector):
             form_id, **self.authentication_kwargs_admin
         )
 
+    @timed("rems")
     def accept_license(self, application_id, license_ids):
         logger.info(
             "accepting licenses %s for application %s",
@@ -245,6 +282,7 @@ class RemsConnector(ExportEntitiesConnector):
             body, **self.authentication_kwargs
         )
 
+    @timed("rems")
     def submit_application(self, application_id):
         logger.info("submitting application %s", application_id)
         rems_applications = remsclient.ApplicationsApi(self.rems_client)
@@ -255,6 +293,7 @@ class RemsConnector(ExportEntitiesConnector):
         if not result.success:
             raise CouldNotSubmitApplicationException(result.errors[0]["type"])
 
+    @timed("rems")
     def close_application(self, application_id):
         logger.info("closing application %s", application_id)
         rems_applications = remsclient.ApplicationsApi(self.rems_client)
@@ -270,7 +309,8 @@ class RemsConnector(ExportEntitiesConnector):
         except ApiException as e:
             raise CouldNotCloseApplicationException(e)
 
-    def my_applications(self):
+    @timed("rems")
+    def my_applications(self, raise_errors=False):
         logger.debug(
             "getting list of user's applications for user %s",
             self.rems_configuration.api_username,
@@ -281,8 +321,11 @@ class RemsConnector(ExportEntitiesConnector):
                 **self.authentication_kwargs
             )
         except ApiException:
+            if raise_errors:
+                raise
             return []
 
+    @timed("rems")
     def applications(self, query):
         logger.debug("getting list of applications for query %s", query)
         try:
@@ -293,6 +336,7 @@ class RemsConnector(ExportEntitiesConnector):
         except ApiException:
             return []
 
+    @timed("rems")
     def create_user(self, user_id, name, email):
         logger.info("Creating REMS user %s (%s,%s)", user_id, name, email)
         rems_users = remsclient.UsersApi(self.rems_client)
@@ -301,6 +345,7 @@ class RemsConnector(ExportEntitiesConnector):
             body, **self.authentication_kwargs_admin
         )
 
+    @timed("rems")
     def add_attachment(self, application_id, file_path):
         logger.info("adding attachment %s to application %s", file_path, application_id)
         rems_attachment = remsclient.ApplicationsApi(self.rems_client)
@@ -309,6 +354,7 @@ class RemsConnector(ExportEntitiesConnector):
         )
         return response.id
 
+    @timed("rems")
     def get_application(self, application_id):
         logger.debug("getting application %s", application_id)
         rems_application = remsclient.ApplicationsApi(self.rems_client)
@@ -20,7 +20,14 @@ from . import api_entities
 from . import web_controllers
 from . import login_controllers
 from . import sitemap_generator
+from . import metrics_controller
 
 __author__ = "Valentin Grouès"
 
-__all__ = [api_entities, web_controllers, login_controllers, sitemap_generator]
+__all__ = [
+    api_entities,
+    web_controllers,
+    login_controllers,
+    sitemap_generator,
+    metrics_controller,
+]
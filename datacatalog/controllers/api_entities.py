@@ -23,19 +23,30 @@
     REST endpoints:
         - api_entity
         - api_entities
+        - api_global_search
+        - api_entities_titles
 """
+import gzip
 import logging
 
-from flask import jsonify, request, Response
+from flask import json, jsonify, request, Response, stream_with_context
 from flask_login import current_user, login_required
 
 from .. import app, csrf, get_access_handler, get_downloads_handler
-from ..exceptions import DownloadsHandlerLinksException, AuthenticationException
+from ..exporter.titles_exporter import get_titles_exporter
+from ..exceptions import (
+    DownloadsHandlerLinksException,
+    AuthenticationException,
+    SolrQueryException,
+)
 
 __author__ = "Valentin Grouès"
 
 logger = logging.getLogger(__name__)
 
+# one year, the titles url contains their version
+TITLES_MAX_AGE = 31536000
+
 
 @app.route("/api/<entity_name>/<entity_id>", methods=["GET"])
 def api_entity(entity_name: str, entity_id: str) -> Response:
@@ -66,17 +77,94 @@ def api_entity_attachments(entity_name: str, entity_id: str) -> Response:
         return jsonify(**{"data": []})
 
 
+@app.route("/api/search", methods=["GET"])
+@csrf.exempt
+def api_global_search() -> Response:
+    """
+    Returns the best matches of each entity type for a query, with the number of hits per type
+    Query string parameters are query and rows, the maximum number of entities per type (default 5)
+    @return: entities grouped by type as json
+    """
+    query = request.args.get("query", "")
+    rows = min(request.args.get("rows", 5, type=int), 100)
+    try:
+        found = app.config["_solr_orm"].global_search(query, rows_per_type=rows)
+    except SolrQueryException as e:
+        logger.error("global search failed", exc_info=e)
+        return (
+            jsonify({"message": "a problem occurred while querying the indexer"}),
+            500,
+        )
+    return jsonify(
+        **{
+            "data": {
+                entity_name: {
+                    "hits": group["hits"],
+                    "entities": [entity.to_api_dict() for entity in group["entities"]],
+                }
+                for entity_name, group in found.items()
+            }
+        }
+    )
+
+
 @app.route("/api/<entity_name>s", methods=["GET"])
 @csrf.exempt
 def api_entities(entity_name: str) -> Response:
     """
     Returns a json representation of all instances for a specific entity class
+    The response is streamed so that entities are serialized batch by batch
     @param entity_name:name of the entity class
     @return: entities as json
     """
     entity_class = app.config["entities"][entity_name]
-    entities = entity_class.query.all()
-    return jsonify(**{"data": [entity.to_api_dict() for entity in entities]})
+
+    def generate():
+        yield '{"data": ['
+        for count, entity in enumerate(entity_class.query.iter_all()):
+            if count:
+                yield ","
+            yield json.dumps(entity.to_api_dict())
+        yield "]}"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+@app.route("/api/<entity_name>s/titles", methods=["GET"])
+@csrf.exempt
+def api_entities_titles(entity_name: str) -> Response:
+    """
+    Returns the id, title and slug of all instances for a specific entity class, used by the search box typeahead
+    The payload is precomputed and gzipped when the entities are imported, see TitlesExporter.
+    As it only changes with the etag, the url built by titles_version can be cached by the browsers for a long time.
+    @param entity_name:name of the entity class
+    @return: titles as json
+    """
+    if entity_name not in app.config["entities"]:
+        return jsonify({"message": "unknown entity"}), 404
+    blob = get_titles_exporter().get(entity_name)
+    if blob.etag in request.if_none_match:
+        response = Response(status=304)
+    elif "gzip" in request.accept_encodings:
+        response = Response(blob.body, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(gzip.decompress(blob.body), mimetype="application/json")
+    response.set_etag(blob.etag)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config.get("TITLES_MAX_AGE", TITLES_MAX_AGE)
+    return response
+
+
+@app.template_global()
+def titles_version(entity_name: str) -> str:
+    """
+    Etag of the current titles of an entity type, added to the titles url so that it changes with them
+    @param entity_name:name of the entity class
+    @return: the etag
+    """
+    return get_titles_exporter().get(entity_name).etag
 
 
 @app.route("/api/downloadLink", methods=["POST"])
@@ -132,19 +220,17 @@ def download_link() -> Response:
 @csrf.exempt
 def api_search_autocomplete_entities(entity_name: str, query: str) -> Response:
     """
-    Returns a json representation of all instances for a specific entity class
+    Returns the terms of the entities of a type starting with the query, for the autocomplete of the search box
+    The suggesters are built by the build_suggesters command, see SolrORM.suggest
     @param query: search query
     @param entity_name:name of the entity class
     @return: suggested terms as json
     """
-
-    params = {
-        "suggest": "true",
-        "suggest.build": "true",
-        "suggest.dictionary": "suggest_" + entity_name,
-        "suggest.q": query,
-    }
-    results = app.config["_solr_orm"].indexer.search(
-        "*:*", search_handler="suggest", **params
-    )
-    return jsonify(**{"data": results.__dict__})
+    if entity_name not in app.config["entities"]:
+        return jsonify({"message": "unknown entity"}), 404
+    try:
+        terms = app.config["_solr_orm"].suggest(entity_name, query)
+    except SolrQueryException as e:
+        logger.error("autocomplete failed", exc_info=e)
+        terms = []
+    return jsonify(**{"data": terms})
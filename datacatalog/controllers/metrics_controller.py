@@ -0,0 +1,41 @@
+# coding=utf-8
+
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+    datacatalog.metrics_controller
+    -------------------
+
+    Monitoring endpoints:
+        - metrics
+"""
+from flask import Response, abort
+
+from .. import app
+from ..metrics import generate_metrics
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics() -> Response:
+    """
+    Prometheus metrics of the calls to the backends, disabled if METRICS_ENABLED is false
+    @return: metrics in the prometheus text format
+    """
+    if not app.config.get("METRICS_ENABLED", True):
+        abort(404)
+    body, content_type = generate_metrics()
+    return Response(body, content_type=content_type)
@@ -179,7 +179,7 @@ def get_multi_arg_url(rule, entity_class: Type[SolrEntity], host_base: str) -> l
     @param host_base: origin url
     @return: list
     """
-    entities = entity_class.query.all()
+    entities = entity_class.query.iter_all(fields=["modified"])
     dynamic_urls = list()
     for entity in entities:
         _url_ = ""
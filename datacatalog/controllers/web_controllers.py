@@ -49,6 +49,12 @@ from werkzeug.wrappers import response
 
 from .. import login_manager, get_access_handler, app
 from ..acces_handler.access_handler import ApplicationState
+from ..cache_tags import (
+    add_page_tags,
+    cached_page,
+    entity_tags,
+    linked_entities_tags,
+)
 from ..exceptions import (
     CouldNotCloseApplicationException,
     SolrQueryException,
@@ -56,6 +62,7 @@ from ..exceptions import (
     DataCatalogException,
 )
 from ..exporter.dats_exporter import DATSExporter
+from ..fan_out import fan_out
 from ..pagination import Pagination
 from ..solr.facets import Facet
 from ..solr.solr_orm_entity import SolrEntity
@@ -139,7 +146,7 @@ def internal_server_error(e) -> Response:
 
 
 @app.route("/<entity_name>s", methods=["GET"])
-@app.cache.cached(timeout=0, query_string=True)
+@cached_page(tags=entity_tags, query_string=True)
 def entities_search(entity_name: str) -> Response:
     """
     Generic search endpoint for any entity
@@ -182,9 +189,11 @@ def home() -> Response:
 
 def landing():
     entities = app.config["entities"]
-    counts_entities = {}
-    for entity_name, entity_class in entities.items():
-        counts_entities[entity_name] = entity_class.query.count()
+    # all the counts are computed with a single request and cached, see SolrORM.counts
+    counts = app.config["_solr_orm"].counts()
+    counts_entities = {
+        entity_name: counts.get(entity_name, 0) for entity_name in entities
+    }
     return render_template("landing.html", counts_entities=counts_entities)
 
 
@@ -256,17 +265,21 @@ def default_search(
     facets_order = facets_order or app.config.get("FACETS_ORDER", {}).get(
         entity_type, []
     )
-    # only do facet when some records are present as solr triggers an error if not
-    if searcher.count() > 0:
-        facets = searcher.get_facets(facets_order)
-        for facet in facets.values():
-            if facet.field_name in search_request.args:
-                values = search_request.args.getlist(facet.field_name)
-                facet.set_values(values)
-            else:
-                facet.use_default()
+    # only retrieve the fields shown by the template, excel export needs all of them
+    if export_excel:
+        fields = None
     else:
-        facets = {}
+        fields = app.config.get("SEARCH_RESULTS_FIELDS", {}).get(
+            template, entity.SEARCH_FIELDS
+        )
+    # facets are retrieved with the results, solr returns empty counts when the index is empty
+    facets = searcher.get_facets(facets_order)
+    for facet in facets.values():
+        if facet.field_name in search_request.args:
+            values = search_request.args.getlist(facet.field_name)
+            facet.set_values(values)
+        else:
+            facet.use_default()
     try:
         fq = None
         if extra_filter:
@@ -286,6 +299,7 @@ def default_search(
             facets=facets.values(),
             fuzzy=True,
             fq=fq,
+            fields=fields,
         )
     except (NotImplementedError, SolrQueryException) as e:
         logger.error(str(e), exc_info=e)
@@ -325,8 +339,17 @@ def default_search(
     )
 
 
+def indexer_error(e: SolrQueryException) -> str:
+    logger.error(str(e), exc_info=e)
+    return render_template(
+        "error.html",
+        message="a problem occurred while querying the indexer",
+        explanation="see log for more details",
+    )
+
+
 @app.route("/e/<entity_name>/<entity_id>", methods=["GET"])
-@app.cache.cached(timeout=0)
+@cached_page(tags=entity_tags)
 def entity_details(entity_name: str, entity_id: str) -> Response:
     """
     Show the detailed view of a specific entity
@@ -336,19 +359,40 @@ def entity_details(entity_name: str, entity_id: str) -> Response:
     @return: HTML page
     """
     try:
-        values = get_entity_with_facets(entity_name, entity_id)
+        values = get_entity_with_facets(entity_name, entity_id, prefetch=False)
     except SolrQueryException as e:
-        logger.error(str(e), exc_info=e)
-        return render_template(
-            "error.html",
-            message="a problem occurred while querying the indexer",
-            explanation="see log for more details",
-        )
+        return indexer_error(e)
     if isinstance(values, response.Response):
         return values
     results, facets = values
     entity = results.entities[0]
     entity_class = entity.__class__
+
+    # the relationships, the attachments and the access are independent, they are retrieved concurrently
+    calls = {
+        "prefetch": lambda: entity.query.prefetch(
+            [entity], entity_class.DEFAULT_PREFETCH
+        )
+    }
+    if app.config.get("PUBLIC_FILE_STORAGE_ROOT"):
+        calls["attachments_exist"] = entity.attachment_exists
+    if current_user.is_authenticated:
+        logger.info(
+            "User %s visiting entity page %s: %s",
+            current_user.id,
+            entity_name,
+            entity_id,
+        )
+        handler = get_access_handler(current_user, entity_name)
+        if handler and handler.supports_listing_accesses():
+            calls["has_access"] = lambda: handler.has_access(entity)
+    try:
+        calls_results = fan_out(**calls)
+    except SolrQueryException as e:
+        return indexer_error(e)
+    # the page also shows the linked entities, it is invalidated when one of them changes
+    add_page_tags(linked_entities_tags(calls_results["prefetch"]))
+
     searcher = entity.query
     searcher_default_sort, searcher_default_sort_order = searcher.get_default_sort("")
     available_field_names = [x.field_name for x in facets]
@@ -383,26 +427,18 @@ def entity_details(entity_name: str, entity_id: str) -> Response:
         kwargs["attachment_url"] = url_for(
             "api_entity_attachments", entity_name=entity_name, entity_id=entity_id
         )
-        kwargs["attachments_exist"] = entity.attachment_exists()
+        kwargs["attachments_exist"] = calls_results["attachments_exist"]
 
-    if current_user.is_authenticated:
+    if "has_access" in calls_results:
+        access = calls_results["has_access"]
         logger.info(
-            "User %s visiting entity page %s: %s",
+            "User %s %s access to %s %s",
             current_user.id,
-            entity_name,
+            "has" if access else "doesn't have",
             entity_id,
+            entity_name,
         )
-        handler = get_access_handler(current_user, entity_name)
-        if handler and handler.supports_listing_accesses():
-            access = handler.has_access(entity)
-            logger.info(
-                "User %s %s access to %s %s",
-                current_user.id,
-                "has" if access else "doesn't have",
-                entity_id,
-                entity_name,
-            )
-            kwargs["has_access"] = access
+        kwargs["has_access"] = access
 
     return render_template(
         entity_name + ".html", fair_evaluations_show=FAIR_EVALUATIONS_SHOW, **kwargs
@@ -410,7 +446,7 @@ def entity_details(entity_name: str, entity_id: str) -> Response:
 
 
 @app.route("/r/<entity_name>/<slug_name>", methods=["GET"])
-@app.cache.cached(timeout=0)
+@cached_page(tags=lambda entity_name, slug_name: entity_tags(entity_name))
 def entity_by_slug(entity_name: str, slug_name: str) -> Response:
     try:
         entity_class = app.config["entities"][entity_name]
@@ -439,7 +475,7 @@ def get_entity(entity_name: str, entity_id: str) -> SolrEntity:
 
 
 def get_entity_with_facets(
-    entity_name: str, entity_id: str
+    entity_name: str, entity_id: str, prefetch: bool = True
 ) -> Tuple[SolrEntity, List[Facet]]:
     facets_order = app.config.get("FACETS_ORDER", {}).get(entity_name, [])
     try:
@@ -456,7 +492,13 @@ def get_entity_with_facets(
             entity_name, entity_id, entity_name, entity_id
         )
     ]
-    results = searcher.search(query="", fq=fq, rows=1, facets=facets.values())
+    results = searcher.search(
+        query="",
+        fq=fq,
+        rows=1,
+        facets=facets.values(),
+        prefetch=entity_class.DEFAULT_PREFETCH if prefetch else None,
+    )
     ordered_facets = []
     if len(results.entities) == 0:
         abort(404)
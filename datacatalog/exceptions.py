@@ -66,6 +66,14 @@ class SolrQueryException(SolrIndexerException):
     pass
 
 
+class SolrVersionConflictException(SolrIndexerException):
+    """
+    Raised when an update is rejected because the document has been modified in solr in the meantime
+    """
+
+    pass
+
+
 class PostRequestException(DataCatalogException):
     """
     Exception for error happening during post request hook
@@ -0,0 +1,166 @@
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+    datacatalog.exporter.titles_exporter
+    -------------------
+
+   Module containing the TitlesExporter class, writing the list of the titles of the entities
+   used by the typeahead of the search box as gzipped json files
+
+
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import NamedTuple, Optional
+
+from .. import app
+
+logger = logging.getLogger(__name__)
+
+_titles_exporter = None
+_titles_exporter_lock = threading.Lock()
+
+
+class TitlesBlob(NamedTuple):
+    # gzipped json
+    body: bytes
+    etag: str
+
+
+class TitlesExporter(object):
+    """
+    Precompute the id, title and slug of all the entities of a type as a single gzipped json document
+    The files are written when the entities are imported and shared by all the processes,
+    each process keeps the last version read in memory.
+    """
+
+    def __init__(self, folder: str) -> None:
+        """
+        Initialize a TitlesExporter instance
+        @param folder: folder holding the files, created if needed
+        """
+        self.folder = folder
+        self._blobs = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "TitlesExporter":
+        """
+        Create a TitlesExporter using the TITLES_FOLDER setting,
+        default to a folder of the temporary directory named after the solr collection
+        @param config: the application configuration
+        @return: a new TitlesExporter instance
+        """
+        folder = config.get(
+            "TITLES_FOLDER",
+            os.path.join(
+                tempfile.gettempdir(), f"datacatalog-{config['SOLR_COLLECTION']}-titles"
+            ),
+        )
+        return cls(folder)
+
+    def get_path(self, entity_name: str) -> str:
+        return os.path.join(self.folder, f"{entity_name}.json.gz")
+
+    @staticmethod
+    def build(entity_name: str) -> bytes:
+        """
+        Serialize and compress the titles of all the entities of a type
+        @param entity_name: name of the entity type, e.g. dataset
+        @return: gzipped json {"data": [{"id": ..., "title": ..., "slug": ...}]}
+        """
+        entity_class = app.config["entities"][entity_name]
+        titles = []
+        for entity in entity_class.query.iter_all(fields=["title", "slugs"]):
+            slugs = getattr(entity, "slugs", None)
+            titles.append(
+                {
+                    "id": entity.id,
+                    "title": entity.title,
+                    "slug": slugs[0] if slugs else None,
+                }
+            )
+        body = json.dumps({"data": titles}, separators=(",", ":")).encode("utf-8")
+        # mtime=0 so that the same titles always give the same bytes and etag
+        return gzip.compress(body, mtime=0)
+
+    def export(self, entity_name: str) -> TitlesBlob:
+        """
+        Build the titles of an entity type and write them to the shared folder
+        @param entity_name: name of the entity type, e.g. dataset
+        @return: the new TitlesBlob
+        """
+        body = self.build(entity_name)
+        path = self.get_path(entity_name)
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as titles_file:
+            titles_file.write(body)
+        # atomic, readers never see a partial file
+        os.replace(tmp_path, path)
+        logger.info("titles of %s exported to %s", entity_name, path)
+        return self._remember(entity_name, os.stat(path), body)
+
+    def _remember(self, entity_name: str, stat: os.stat_result, body: bytes):
+        blob = TitlesBlob(body, hashlib.sha1(body).hexdigest())
+        with self._lock:
+            self._blobs[entity_name] = ((stat.st_ino, stat.st_mtime_ns), blob)
+        return blob
+
+    def get(self, entity_name: str) -> TitlesBlob:
+        """
+        Current titles of an entity type, read from the shared folder if they changed since the last call
+        or built if they have never been exported
+        @param entity_name: name of the entity type, e.g. dataset
+        @return: the TitlesBlob
+        """
+        path = self.get_path(entity_name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return self.export(entity_name)
+        blob = self._get_remembered(entity_name, stat)
+        if blob is not None:
+            return blob
+        with open(path, "rb") as titles_file:
+            body = titles_file.read()
+        return self._remember(entity_name, stat, body)
+
+    def _get_remembered(
+        self, entity_name: str, stat: os.stat_result
+    ) -> Optional[TitlesBlob]:
+        with self._lock:
+            remembered = self._blobs.get(entity_name)
+        if remembered and remembered[0] == (stat.st_ino, stat.st_mtime_ns):
+            return remembered[1]
+        return None
+
+
+def get_titles_exporter() -> TitlesExporter:
+    """
+    TitlesExporter shared by the requests of the process, configured by TITLES_FOLDER
+    @return: the TitlesExporter instance, created on first use
+    """
+    global _titles_exporter
+    with _titles_exporter_lock:
+        if _titles_exporter is None:
+            _titles_exporter = TitlesExporter.from_config(app.config)
+        return _titles_exporter
@@ -0,0 +1,91 @@
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+    datacatalog.fan_out
+    -------------------
+
+   Helper running independent blocking calls (solr, webdav, rems...) concurrently in a thread pool
+   shared by the requests of the process
+
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from flask import has_request_context, copy_current_request_context
+
+from . import app
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool shared by all the fan_out calls, its size is set by FAN_OUT_WORKERS (default 8)
+    @return: the ThreadPoolExecutor instance, created on first use
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get("FAN_OUT_WORKERS", 8),
+                thread_name_prefix="fan-out",
+                initializer=_mark_worker,
+            )
+        return _executor
+
+
+def _mark_worker() -> None:
+    _worker.active = True
+
+
+def fan_out(**calls: Callable[[], Any]) -> Dict[str, Any]:
+    """
+    Run functions without arguments concurrently and wait for all of them, e.g.
+        results = fan_out(access=lambda: handler.has_access(entity), attachments=entity.attachment_exists)
+    The total duration is the one of the slowest call rather than the sum of all of them.
+    The calls run with the current request context, if any. Calls made from a fan_out worker run sequentially
+    so that nested fan outs can't exhaust the pool.
+    The exception raised by a call, if any, is raised once all the calls are done
+    @param calls: functions to run, by name
+    @return: dict of the functions names and their results
+    """
+    if len(calls) <= 1 or getattr(_worker, "active", False):
+        return {name: call() for name, call in calls.items()}
+    if has_request_context():
+        calls = {
+            name: copy_current_request_context(call) for name, call in calls.items()
+        }
+    executor = get_executor()
+    futures = {name: executor.submit(call) for name, call in calls.items()}
+    results = {}
+    error = None
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            logger.debug("call %s failed", name)
+            if error is None:
+                error = e
+    if error is not None:
+        raise error
+    return results
@@ -24,7 +24,7 @@
 
 """
 import logging
-from typing import List
+from typing import Dict, List, Set
 
 from .. import app
 from ..connector.entities_connector import ImportEntitiesConnector
@@ -48,26 +48,28 @@ class EntitiesImporter(object):
         for connector in connectors:
             assert isinstance(connector, ImportEntitiesConnector)
 
-    def import_all(self) -> None:
+    def import_all(self) -> Dict[str, Set[str]]:
         """
         Loop over the connectors to build the entities and store them in solr
-        A commit is triggered at the end
+        Entities are sent in batches, see SolrIndexWriter. A commit is triggered at the end
+        @return: ids of the entities added or modified per entity name, see SolrIndexWriter.modified_ids
         """
         logger.info("Importing all entities")
         count = 0
-        for connector in self.connectors:
-            count_connector = 0
-            entities = connector.build_all_entities()
-            for entity in entities:
-                entity.set_computed_values()
-                entity.connector_name = connector.__class__.__name__
-                entity.save()
-                count += 1
-                count_connector += 1
-            logger.info(
-                "%s entities imported for connector %s",
-                count_connector,
-                connector.__class__.__name__,
-            )
-        app.config["_solr_orm"].commit()
+        with app.config["_solr_orm"].writer() as writer:
+            for connector in self.connectors:
+                count_connector = 0
+                entities = connector.build_all_entities()
+                for entity in entities:
+                    entity.set_computed_values()
+                    entity.connector_name = connector.__class__.__name__
+                    entity.save(writer=writer)
+                    count += 1
+                    count_connector += 1
+                logger.info(
+                    "%s entities imported for connector %s",
+                    count_connector,
+                    connector.__class__.__name__,
+                )
         logger.info("%s entities have been imported", count)
+        return writer.modified_ids
@@ -0,0 +1,131 @@
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+    datacatalog.metrics
+    -------------------
+
+   Prometheus metrics of the calls to the backends (solr, rems, ldap, webdav), exposed by the /metrics endpoint
+   With several gunicorn workers, set the PROMETHEUS_MULTIPROC_DIR environment variable to an empty folder
+   shared by the workers and call multiprocess.mark_process_dead from the child_exit hook of gunicorn (see the README),
+   see https://github.com/prometheus/client_python#multiprocess-mode-eg-gunicorn
+
+"""
+import functools
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+logger = logging.getLogger(__name__)
+
+LABELS = ["backend", "operation", "entity"]
+
+REQUEST_DURATION = Histogram(
+    "datacatalog_backend_request_duration_seconds",
+    "Wall time of the calls to the backends",
+    LABELS,
+)
+REQUEST_ERRORS = Counter(
+    "datacatalog_backend_request_errors",
+    "Calls to the backends that raised an exception",
+    LABELS,
+)
+SOLR_QTIME = Histogram(
+    "datacatalog_solr_qtime_seconds",
+    "Time spent by solr on the queries (QTime), to compare with the wall time",
+    ["operation", "entity"],
+)
+SOLR_QUERY_CACHE = Counter(
+    "datacatalog_solr_query_cache_requests",
+    "Read requests served by the query cache (hit) or sent to solr (miss)",
+    ["operation", "entity", "result"],
+)
+
+
+@contextmanager
+def track(backend: str, operation: str, entity: str = ""):
+    """
+    Context manager recording the duration of a call to a backend, and the error if an exception is raised
+    @param backend: solr, rems, ldap, webdav...
+    @param operation: name of the call, e.g. search
+    @param entity: entity type concerned by the call, if any
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REQUEST_ERRORS.labels(backend, operation, entity).inc()
+        raise
+    finally:
+        REQUEST_DURATION.labels(backend, operation, entity).observe(
+            time.perf_counter() - start
+        )
+
+
+def timed(backend: str, operation: str = None, entity: str = ""):
+    """
+    Decorator version of track
+    @param backend: solr, rems, ldap, webdav...
+    @param operation: name of the call, default to the name of the decorated function
+    @param entity: entity type concerned by the call, if any
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def decorated_function(*args, **kwargs):
+            with track(backend, operation or function.__name__, entity):
+                return function(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator
+
+
+def observe_qtime(operation: str, entity: str, results) -> None:
+    """
+    Record the QTime of a solr response
+    @param operation: name of the call, e.g. search
+    @param entity: entity type concerned by the call, if any
+    @param results: pysolr.Results instance
+    """
+    qtime = getattr(results, "qtime", None)
+    if qtime is not None:
+        SOLR_QTIME.labels(operation, entity).observe(qtime / 1000)
+
+
+def generate_metrics() -> Tuple[bytes, str]:
+    """
+    Current values of the metrics in the prometheus text format, aggregated over all the workers in multiprocess mode
+    @return: the body and the content type of the response
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
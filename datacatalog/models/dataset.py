@@ -67,6 +67,17 @@ class Dataset(SolrEntity, EntityWithSlugs):
 
     # specifies the list of compatibles connectors
     COMPATIBLE_CONNECTORS = ["Ckan", "Limesurvey", "Geo", "Json", "Dats", "Daisy"]
+    # relationships displayed on the dataset page
+    DEFAULT_PREFETCH = ["study", "study.project", "project"]
+    # attributes displayed on the search results page
+    SEARCH_FIELDS = [
+        "title",
+        "open_access_link",
+        "dataset_created",
+        "groups",
+        "tags",
+        "fair_evaluation",
+    ]
 
     title = SolrField("title")
     data_standards = SolrField("data_standards", multivalued=True)
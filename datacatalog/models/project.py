@@ -48,6 +48,18 @@ class Project(SolrEntity, EntityWithSlugs):
 
     # specifies the list of compatibles connectors
     COMPATIBLE_CONNECTORS = ["Json", "Dats", "Geo", "Daisy"]
+    # relationships displayed on the project page
+    DEFAULT_PREFETCH = ["studies", "studies.datasets", "datasets"]
+    # attributes displayed on the search results page
+    SEARCH_FIELDS = [
+        "title",
+        "display_name",
+        "description",
+        "keywords",
+        "start_date",
+        "website",
+        "fair_evaluation",
+    ]
     query_class = SolrAutomaticQuery
     business_fax_number = SolrField("business_fax_number", indexed=False)
     datasets = SolrForeignKeyField(
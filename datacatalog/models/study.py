@@ -46,6 +46,18 @@ class Study(SolrEntity, EntityWithSlugs):
 
     # specifies the list of compatibles connectors
     COMPATIBLE_CONNECTORS = ["Json", "Dats", "Geo"]
+    # relationships displayed on the study page
+    DEFAULT_PREFETCH = ["project", "datasets"]
+    # attributes displayed on the search results page
+    SEARCH_FIELDS = [
+        "title",
+        "description",
+        "keywords",
+        "types",
+        "category",
+        "therapeutic_area_standards_disease",
+        "fair_evaluation",
+    ]
     query_class = SolrAutomaticQuery
     # age_range = SolrField("age_range")
     # bmi_range = SolrField("bmi_range", indexed=False)
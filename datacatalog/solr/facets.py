@@ -21,6 +21,7 @@
      - Range
      - Facet
      - FacetRange
+     - FacetStats
 
 """
 import logging
@@ -120,3 +121,25 @@ class FacetRange(Facet):
         """
         super().__init__(field_name, label)
         self.range = facet_range
+
+
+class FacetStats(Facet):
+    """
+    Version of the Facet class computing aggregations (min, max, avg...) of the values of a numeric field
+    on the documents matching the search, rather than counts per value
+    """
+
+    DEFAULT_FUNCTIONS = ["min", "max", "avg"]
+
+    def __init__(
+        self, field_name: str, label: str = None, functions: List[str] = None
+    ) -> None:
+        """
+        Initialize a FacetStats instance setting the field name, the label and the aggregations to compute
+        @param field_name: the solr field name that we want to compute statistics for
+        @param label: label that will be used as header of the facet on the search page
+        @param functions: names of the aggregation functions, e.g. min, max, avg, sum, missing, unique,
+         see https://lucene.apache.org/solr/guide/8_4/json-facet-api.html#stat-facet-functions
+        """
+        super().__init__(field_name, label)
+        self.functions = functions or list(self.DEFAULT_FUNCTIONS)
@@ -23,27 +23,50 @@
    Module containing the following classes:
      - SolrORM: update and create solr fields using the solr api
      - SolrQuery: base class to query solr
+     - SolrDocumentDecoder: builds entities instances from solr documents
 
 """
 import json
 import logging
+import threading
+import time
 
 from datetime import datetime
-from typing import Type, Dict, List, Tuple, Optional, Union
+from typing import (
+    Type,
+    Dict,
+    List,
+    Tuple,
+    Optional,
+    Union,
+    Generator,
+    Callable,
+    Any,
+    FrozenSet,
+)
 
 import pysolr
-import requests
 from flask import Response
 from pysolr import Solr, SolrError
-from requests import HTTPError
 from werkzeug.exceptions import abort
 
-from .facets import Facet, FacetRange
-from .solr_orm_entity import DATETIME_FORMAT, DATETIME_FORMAT_NO_MICRO, SolrEntity
+from .facets import Facet, FacetRange, FacetStats
+from .solr_orm_entity import (
+    DATETIME_FORMAT,
+    DATETIME_FORMAT_NO_MICRO,
+    SolrEntity,
+    RelationshipAccessor,
+    ForeignKeyAccessor,
+    ReversedRelationshipAccessor,
+)
 from .solr_orm_fields import SolrField, SolrForeignKeyField, SolrJsonField
-from .solr_orm_schema import SolrSchemaAdmin
+from .solr_orm_schema import SolrSchemaAdmin, SolrSchemaPlan, SchemaValidationReport
+from .solr_orm_writer import SolrIndexWriter, to_solr_value
+from .solr_query_cache import IndexGeneration, QueryCache, DEFAULT_QUERY_CACHE_SIZE
+from .solr_session import SolrSession
 from .. import app
-from ..exceptions import SolrQueryException
+from ..exceptions import SolrQueryException, SolrVersionConflictException
+from ..metrics import SOLR_QUERY_CACHE, observe_qtime, track
 
 # suffix added to the query string enable fuzzy search
 # fuzzy search tolerance can be configured with FUZZY_SEARCH_LEVEL config parameter
@@ -51,11 +74,133 @@ from ..exceptions import SolrQueryException
 
 FUZZY_SEARCH_SUFFIX = "~{}".format(app.config.get("FUZZY_SEARCH_LEVEL", 4))
 
+# number of documents retrieved per request when iterating over all the entities of a type
+DEFAULT_BATCH_SIZE = app.config.get("SOLR_BATCH_SIZE", 500)
+# solr default value of facet.limit
+FACET_LIMIT = 100
+# names of the statistics of the stats component for the JSON Facet API functions
+CLASSIC_STATS_NAMES = {"avg": "mean", "unique": "countDistinct"}
+# separator of the values of the terms query parser, ids coming from the connectors may contain commas
+TERMS_SEPARATOR = "\u0001"
+
 logger = logging.getLogger(__name__)
 
 __author__ = "Valentin Grouès"
 
 
+def terms_filter(field: str, values: List[str]) -> str:
+    """
+    Build a filter query matching the documents having any of the values, see the solr terms query parser
+    @param field: name of the solr field
+    @param values: values to match, they are not split on commas
+    @return: the filter query
+    """
+    return '{!terms f=%s separator="%s"}%s' % (
+        field,
+        TERMS_SEPARATOR,
+        TERMS_SEPARATOR.join(values),
+    )
+
+
+def parse_solr_date(value: str) -> datetime:
+    """
+    Parse a date returned by solr, e.g. 2020-04-30T10:11:12Z or 2020-04-30T10:11:12.123Z
+    @param value: date string in solr format
+    @return: naive datetime instance
+    """
+    try:
+        return datetime.fromisoformat(value[:-1] if value.endswith("Z") else value)
+    except ValueError:
+        try:
+            return datetime.strptime(value, DATETIME_FORMAT)
+        except ValueError:
+            return datetime.strptime(value, DATETIME_FORMAT_NO_MICRO)
+
+
+class SolrDocumentDecoder(object):
+    """
+    Builds SolrEntity instances from solr documents.
+    The prefixed keys and values converters are computed once per entity class and instances are created
+    without calling __init__ as all their attributes are set from the documents.
+    """
+
+    def __init__(self, entity_class: Type[SolrEntity]) -> None:
+        """
+        Initialize a SolrDocumentDecoder instance for a SolrEntity subclass
+        @param entity_class: SolrEntity subclass, its _solr_fields attribute should be set
+        """
+        self.entity_class = entity_class
+        entity_name = entity_class.__name__.lower()
+        self.id_start_index = len(entity_name) + 1
+        # list of (attribute name, solr document key, converter or None)
+        self.plan = [
+            (attribute_name, entity_name + "_" + field.name, self._get_converter(field))
+            for attribute_name, field in entity_class._solr_fields.items()
+        ]
+        self._partial_plans = {}
+
+    @staticmethod
+    def _get_converter(field: SolrField) -> Optional[Callable[[Any], Any]]:
+        if field.type == "pdate":
+            return parse_solr_date
+        if isinstance(field, SolrJsonField):
+            if field.model:
+                from_json = field.model.from_json
+                return lambda values: [from_json(json.loads(value)) for value in values]
+            return json.loads
+        return None
+
+    def _get_plan(self, fields: Optional[List[str]]) -> list:
+        if fields is None:
+            return self.plan
+        key = tuple(fields)
+        plan = self._partial_plans.get(key)
+        if plan is None:
+            plan = [entry for entry in self.plan if entry[0] in fields]
+            self._partial_plans[key] = plan
+        return plan
+
+    def decode(self, doc: dict, fields: List[str] = None) -> SolrEntity:
+        """
+        Build an instance from a solr document
+        @param doc: the solr document
+        @param fields: if set, only these attributes are set on the instance, see PartialEntitiesLoader
+        @return: the new instance
+        """
+        return self._decode(doc, self._get_plan(fields))
+
+    def decode_many(
+        self, docs: List[dict], fields: List[str] = None
+    ) -> List[SolrEntity]:
+        """
+        Build the instances for a list of solr documents, e.g. a page of results
+        @param docs: the solr documents
+        @param fields: if set, only these attributes are set on the instances
+        @return: list of new instances
+        """
+        plan = self._get_plan(fields)
+        return [self._decode(doc, plan) for doc in docs]
+
+    def _decode(self, doc: dict, plan: list) -> SolrEntity:
+        new_instance = self.entity_class.__new__(self.entity_class)
+        values = new_instance.__dict__
+        for attribute_name, key, converter in plan:
+            value = doc.get(key)
+            if value is not None and converter is not None:
+                value = converter(value)
+            elif isinstance(value, list):
+                # documents may be shared through the query cache, see SolrORM.search
+                value = list(value)
+            values[attribute_name] = value
+        if "_version_" in doc:
+            # used for optimistic concurrency, see SolrEntity.save
+            values["_version_"] = doc["_version_"]
+        doc_id = doc.get("id")
+        # remove prefix from id (entity_name_)
+        values["id"] = doc_id[self.id_start_index :] if doc_id else doc_id
+        return new_instance
+
+
 class SolrQuery(object):
     """
     Class to handle search and retrieval of entities from Solr
@@ -81,6 +226,7 @@ class SolrQuery(object):
         self.class_object = class_object
         self.entity_name = class_object.__name__.lower()
         self.solr_orm = solr_orm
+        self.decoder = SolrDocumentDecoder(class_object)
 
     def search_holding_entities(self, target_entity_id, field_name, source_entity_type):
         params = {
@@ -89,14 +235,96 @@ class SolrQuery(object):
                 f'{source_entity_type}_{field_name}:"{target_entity_id}"',
             ]
         }
-        results = self.solr_orm.indexer.search("*:*", **params)
-        entities = []
-        for doc in results.docs:
-            entity = self._build_instance(doc)
-            entities.append(entity)
-        results.entities = entities
+        results = self.solr_orm.search(
+            "*:*",
+            operation="search_holding_entities",
+            entity=source_entity_type,
+            **params,
+        )
+        results.entities = self.decoder.decode_many(results.docs)
         return results
 
+    def search_holding_entities_many(
+        self, target_entity_ids: List[str], field_name: str, source_entity_type: str
+    ) -> List[SolrEntity]:
+        """
+        Similar to search_holding_entities but for several target entities at once
+        @param target_entity_ids: ids of the referenced entities
+        @param field_name: name of the foreign key field holding the reference
+        @param source_entity_type: type of the entities holding the reference
+        @return: list of entities referencing at least one of the target entities
+        """
+        if not target_entity_ids:
+            return []
+        fq = [
+            f'type:"{source_entity_type}"',
+            terms_filter(f"{source_entity_type}_{field_name}", target_entity_ids),
+        ]
+        return [
+            self.decoder.decode(doc)
+            for doc in self._iter_docs(DEFAULT_BATCH_SIZE, q="*:*", fq=fq, cached=True)
+        ]
+
+    def prefetch(
+        self, entities: List[SolrEntity], paths: List[str]
+    ) -> List[SolrEntity]:
+        """
+        Resolve the relationships of the entities, one batched query per level of the relationships tree.
+        Resolved entities are attached to the instances, e.g. after prefetch(projects, ["studies", "studies.datasets"])
+        accessing project.studies_entities and study.datasets_entities won't trigger any query.
+        @param entities: instances of self.class_object
+        @param paths: relationships to resolve, a path is a dot separated list of foreign key attributes
+        or reversed relationships names
+        @return: all the linked entities resolved, at any level
+        """
+        tree = {}
+        for path in paths or []:
+            node = tree
+            for name in path.split("."):
+                node = node.setdefault(name, {})
+        resolved = []
+        self._prefetch_tree(self.class_object, entities, tree, resolved)
+        return resolved
+
+    @classmethod
+    def _prefetch_tree(
+        cls,
+        entity_class: Type[SolrEntity],
+        entities: List[SolrEntity],
+        tree: dict,
+        resolved: List[SolrEntity],
+    ) -> None:
+        if not entities:
+            return
+        for name, subtree in tree.items():
+            accessors = cls._get_accessors(entity_class, name)
+            if not accessors:
+                logger.warning(
+                    "unknown relationship %s for entity %s", name, entity_class.__name__
+                )
+                continue
+            accessor, aliases = accessors[0], accessors[1:]
+            linked_entities = accessor.prefetch(entities)
+            resolved.extend(linked_entities)
+            for alias in aliases:
+                for entity in entities:
+                    alias.prime(entity, accessor.__get__(entity, entity_class))
+            if subtree and linked_entities:
+                cls._prefetch_tree(
+                    type(linked_entities[0]), linked_entities, subtree, resolved
+                )
+
+    @staticmethod
+    def _get_accessors(
+        entity_class: Type[SolrEntity], name: str
+    ) -> List[RelationshipAccessor]:
+        accessors = []
+        for suffix in ["_entities", "_entity"]:
+            accessor = getattr(entity_class, name + suffix, None)
+            if isinstance(accessor, RelationshipAccessor):
+                accessors.append(accessor)
+        return accessors
+
     def search(
         self,
         query: str,
@@ -107,6 +335,9 @@ class SolrQuery(object):
         fq: List[str] = None,
         facets: List[Facet] = None,
         fuzzy: bool = False,
+        prefetch: List[str] = None,
+        fields: List[str] = None,
+        json_facets: bool = None,
     ) -> pysolr.Results:
         """
         Execute a solr search
@@ -119,6 +350,11 @@ class SolrQuery(object):
         See https://lucene.apache.org/solr/guide/8_4/common-query-parameters.html#fq-filter-query-parameter
         @param facets: list of facets to retrieve
         @param fuzzy:boolean triggering fuzzy search to be active or not
+        @param prefetch: relationships to resolve for the entities found, see prefetch method
+        @param fields: list of attributes to retrieve, all stored fields are retrieved if None.
+        Other attributes are loaded on access, in a single request for all the entities of the results
+        @param json_facets: compute the facets with the JSON Facet API rather than the facet.* parameters,
+        default to SOLR_JSON_FACETS. The facets of the results are keyed by attribute name either way
         @return: a pysolr.Results instance containing the search results
         """
         if sort_order or sort:
@@ -166,68 +402,196 @@ class SolrQuery(object):
             params["rows"] = rows
         if start:
             params["start"] = start
+        if fields is not None:
+            params["fl"] = self.get_fl(fields)
 
+        if json_facets is None:
+            json_facets = app.config.get("SOLR_JSON_FACETS", True)
         if facets:
-            params["facet"] = "on"
-            params["facet.field"] = []
-            params["facet.range"] = []
             for facet in facets:
-                if isinstance(facet, FacetRange):
-                    params[
-                        "f.{}_{}.facet.range.start".format(
-                            self.entity_name, facet.field_name
-                        )
-                    ] = facet.range.start
-                    params[
-                        "f.{}_{}.facet.range.end".format(
-                            self.entity_name, facet.field_name
-                        )
-                    ] = facet.range.end
-                    params[
-                        "f.{}_{}.facet.range.gap".format(
-                            self.entity_name, facet.field_name
-                        )
-                    ] = facet.range.gap
-                    params[
-                        "f.{}_{}.facet.range.other".format(
-                            self.entity_name, facet.field_name
-                        )
-                    ] = facet.range.other
-                    params["facet.range"].append(self.entity_name, facet.field_name)
-                    for value in facet.values:
-                        fq.append(
-                            "{}_{}:{}".format(self.entity_name, facet.field_name, value)
-                        )
-                else:
-                    for value in facet.values:
-                        value = value.replace('"', '\\"')
-                        fq.append(
-                            '{}_{}:"{}"'.format(
-                                self.entity_name, facet.field_name, value
-                            )
-                        )
-                    params["facet.field"].append(
-                        "{}_{}".format(self.entity_name, facet.field_name)
-                    )
+                fq.extend(self._get_facet_filters(facet))
+            if json_facets:
+                params["json.facet"] = json.dumps(self._get_json_facets(facets))
+            else:
+                params.update(self._get_classic_facets_params(facets))
         try:
-            results = self.solr_orm.indexer.search(q, **params)
-            entities = []
-            for doc in results.docs:
-                entity = self._build_instance(doc)
-                entities.append(entity)
+            results = self.solr_orm.search(
+                q, operation="search", entity=self.entity_name, **params
+            )
+            entities = self.decoder.decode_many(results.docs, fields)
+            if fields is not None:
+                PartialEntitiesLoader(self, entities, fields)
             results.entities = entities
-            # replace facets fields name to remove prefix
-            facet_fields = results.facets.get("facet_fields")
-            new_facets_fields = {}
-            if facet_fields:
-                for field_name, facet_value in facet_fields.items():
-                    start_index = len(self.entity_name + "_")
-                    new_facets_fields[field_name[start_index:]] = facet_value
-                results.facets["facet_fields"] = new_facets_fields
+            if facets:
+                if json_facets:
+                    results.facets = self._parse_json_facets(
+                        results.raw_response.get("facets", {}), facets
+                    )
+                else:
+                    results.facets = self._parse_classic_facets(results, facets)
+            if prefetch:
+                self.prefetch(entities, prefetch)
         except SolrError as e:
             raise SolrQueryException(e)
         return results
 
+    def _get_facet_filters(self, facet: Facet) -> List[str]:
+        solr_field_name = f"{self.entity_name}_{facet.field_name}"
+        if isinstance(facet, FacetStats):
+            return []
+        if isinstance(facet, FacetRange):
+            # range values are already solr ranges, e.g. [0 TO 20}
+            return [f"{solr_field_name}:{value}" for value in facet.values]
+        filters = []
+        for value in facet.values:
+            value = value.replace('"', '\\"')
+            filters.append(f'{solr_field_name}:"{value}"')
+        return filters
+
+    @staticmethod
+    def _get_json_facet_key(facet: Facet) -> str:
+        """
+        Label of a facet in the json.facet parameter and in the response, the attribute name followed by
+        the kind of facet so that a range and a stats facet on the same field don't overwrite each other
+        @param facet: the facet
+        @return: <field>, <field>__range or <field>__stats
+        """
+        if isinstance(facet, FacetStats):
+            return f"{facet.field_name}__stats"
+        if isinstance(facet, FacetRange):
+            return f"{facet.field_name}__range"
+        return facet.field_name
+
+    def _get_json_facets(self, facets: List[Facet]) -> dict:
+        """
+        Build the json.facet parameter, each facet is labelled with the attribute name and its kind so that
+        solr returns them without prefix, see _get_json_facet_key
+        see https://lucene.apache.org/solr/guide/8_4/json-facet-api.html
+        @param facets: list of facets to compute
+        @return: the facets definition
+        """
+        json_facets = {}
+        for facet in facets:
+            solr_field_name = f"{self.entity_name}_{facet.field_name}"
+            if isinstance(facet, FacetStats):
+                # a query facet on the whole result set, its aggregations are nested under the facet name
+                json_facets[self._get_json_facet_key(facet)] = {
+                    "type": "query",
+                    "q": "*:*",
+                    "facet": {
+                        function: f"{function}({solr_field_name})"
+                        for function in facet.functions
+                    },
+                }
+            elif isinstance(facet, FacetRange):
+                json_facet = {
+                    "type": "range",
+                    "field": solr_field_name,
+                    "start": facet.range.start,
+                    "end": facet.range.end,
+                    "gap": facet.range.gap,
+                }
+                if facet.range.other:
+                    json_facet["other"] = facet.range.other
+                json_facets[self._get_json_facet_key(facet)] = json_facet
+            else:
+                # same defaults as facet.field
+                json_facets[self._get_json_facet_key(facet)] = {
+                    "type": "terms",
+                    "field": solr_field_name,
+                    "limit": FACET_LIMIT,
+                    "mincount": 0,
+                }
+        return json_facets
+
+    @classmethod
+    def _parse_json_facets(cls, response_facets: dict, facets: List[Facet]) -> dict:
+        """
+        Convert the facets returned by the JSON Facet API to the format of the facet_counts of the classic faceting
+        @param response_facets: the facets section of the solr response
+        @param facets: list of facets requested
+        @return: dict with facet_fields, facet_ranges and facet_stats keyed by attribute name
+        """
+        parsed = {"facet_fields": {}, "facet_ranges": {}, "facet_stats": {}}
+        for facet in facets:
+            facet_response = response_facets.get(cls._get_json_facet_key(facet))
+            if facet_response is None:
+                # solr omits the facets when no document matches
+                facet_response = {}
+            if isinstance(facet, FacetStats):
+                parsed["facet_stats"][facet.field_name] = {
+                    function: facet_response.get(function)
+                    for function in facet.functions
+                }
+                continue
+            counts = []
+            for bucket in facet_response.get("buckets", []):
+                counts += [bucket["val"], bucket["count"]]
+            if isinstance(facet, FacetRange):
+                facet_range = {
+                    "counts": counts,
+                    "start": facet.range.start,
+                    "end": facet.range.end,
+                    "gap": facet.range.gap,
+                }
+                for other in ["before", "after", "between"]:
+                    if other in facet_response:
+                        facet_range[other] = facet_response[other]["count"]
+                parsed["facet_ranges"][facet.field_name] = facet_range
+            else:
+                parsed["facet_fields"][facet.field_name] = counts
+        return parsed
+
+    def _get_classic_facets_params(self, facets: List[Facet]) -> dict:
+        """
+        Build the facet.* and stats.* parameters
+        see https://lucene.apache.org/solr/guide/8_4/faceting.html
+        @param facets: list of facets to compute
+        @return: the parameters to add to the search request
+        """
+        params = {"facet": "on", "facet.field": [], "facet.range": []}
+        for facet in facets:
+            solr_field_name = f"{self.entity_name}_{facet.field_name}"
+            if isinstance(facet, FacetStats):
+                params["stats"] = "true"
+                params.setdefault("stats.field", []).append(solr_field_name)
+            elif isinstance(facet, FacetRange):
+                params[f"f.{solr_field_name}.facet.range.start"] = facet.range.start
+                params[f"f.{solr_field_name}.facet.range.end"] = facet.range.end
+                params[f"f.{solr_field_name}.facet.range.gap"] = facet.range.gap
+                if facet.range.other:
+                    params[f"f.{solr_field_name}.facet.range.other"] = facet.range.other
+                params["facet.range"].append(solr_field_name)
+            else:
+                params["facet.field"].append(solr_field_name)
+        return params
+
+    def _parse_classic_facets(
+        self, results: pysolr.Results, facets: List[Facet]
+    ) -> dict:
+        """
+        Remove the prefix of the facets fields names and add the statistics to the facets
+        @param results: the search results
+        @param facets: list of facets requested
+        @return: dict with facet_fields, facet_ranges and facet_stats keyed by attribute name
+        """
+        start_index = len(self.entity_name + "_")
+        parsed = {"facet_stats": {}}
+        for key in ["facet_fields", "facet_ranges"]:
+            parsed[key] = {
+                field_name[start_index:]: value
+                for field_name, value in results.facets.get(key, {}).items()
+            }
+        stats_fields = (results.stats or {}).get("stats_fields", {})
+        for facet in facets:
+            if isinstance(facet, FacetStats):
+                stats = stats_fields.get(f"{self.entity_name}_{facet.field_name}") or {}
+                parsed["facet_stats"][facet.field_name] = {
+                    function: stats.get(CLASSIC_STATS_NAMES.get(function, function))
+                    for function in facet.functions
+                }
+        return parsed
+
     def get_default_sort(self, query: str) -> Tuple[str, str]:
         """
         For a given query, return the default
@@ -269,21 +633,68 @@ class SolrQuery(object):
         ]
         return options_with_prefix, getattr(self, "SORT_LABELS", [])
 
-    def get(self, entity_id: str) -> Optional[SolrEntity]:
+    def get(self, entity_id: str, prefetch: List[str] = None) -> Optional[SolrEntity]:
         """
         Retrieve from solr and build a SolrEntity instance for a given entity id
         @param entity_id: id of the entity to retrieve from solr
+        @param prefetch: relationships to resolve, see prefetch method
         @return: a self.class_object instance or None if not found
         """
-        results = self.solr_orm.indexer.search(
-            q='id:"{}_{}"'.format(self.entity_name, entity_id), rows=1
+        results = self.solr_orm.search(
+            q='id:"{}_{}"'.format(self.entity_name, entity_id),
+            rows=1,
+            operation="get",
+            entity=self.entity_name,
         )
         if results.hits == 0:
             return None
         doc = results.docs[0]
         new_instance = self._build_instance(doc)
+        if prefetch:
+            self.prefetch([new_instance], prefetch)
         return new_instance
 
+    def get_many(self, entity_ids: List[str]) -> List[SolrEntity]:
+        """
+        Retrieve from solr in a single request the entities for a list of entity ids
+        Uses the terms query parser, see https://solr.apache.org/guide/8_4/other-parsers.html#terms-query-parser
+        @param entity_ids: ids of the entities to retrieve from solr
+        @return: list of self.class_object instances in the order of entity_ids, ids not found are skipped
+        """
+        if not entity_ids:
+            return []
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        entities = {
+            entity.id: entity
+            for entity in self.decoder.decode_many(self._get_docs(entity_ids))
+        }
+        return [
+            entities[entity_id] for entity_id in entity_ids if entity_id in entities
+        ]
+
+    def _get_docs(self, entity_ids: List[str], fl: Optional[str] = None) -> List[dict]:
+        """
+        Retrieve from solr in a single request the raw documents for a list of entity ids
+        @param entity_ids: ids of the entities to retrieve from solr
+        @param fl: comma separated list of solr fields to retrieve
+        @return: list of solr documents
+        """
+        unique_ids = list(dict.fromkeys(entity_ids))
+        terms = [
+            "{}_{}".format(self.entity_name, entity_id) for entity_id in unique_ids
+        ]
+        params = {"fq": terms_filter("id", terms), "rows": len(unique_ids)}
+        if fl:
+            params["fl"] = fl
+        try:
+            results = self.solr_orm.search(
+                q="*:*", operation="get_many", entity=self.entity_name, **params
+            )
+        except SolrError as e:
+            raise SolrQueryException(e)
+        return results.docs
+
     def get_by_slug(self, slug: str) -> Optional[SolrEntity]:
         """
         Retrieve from solr and build a SolrEntity instance for a given entity slug
@@ -291,8 +702,11 @@ class SolrQuery(object):
         @return: a self.class_object instance or None if not found
         """
 
-        results = self.solr_orm.indexer.search(
-            q='{}_slugs:"{}"'.format(self.entity_name, slug), rows=1
+        results = self.solr_orm.search(
+            q='{}_slugs:"{}"'.format(self.entity_name, slug),
+            rows=1,
+            operation="get_by_slug",
+            entity=self.entity_name,
         )
         if results.hits == 0:
             return None
@@ -311,38 +725,41 @@ class SolrQuery(object):
             abort(404)
         return new_instance
 
-    def _build_instance(self, doc):
-        new_instance = self.class_object()
-        for attribute_name, field in self.class_object._solr_fields.items():
-            solr_value = doc.get(self.entity_name + "_" + field.name, None)
-            if solr_value is not None and field.type == "pdate":
-                try:
-                    solr_value = datetime.strptime(solr_value, DATETIME_FORMAT)
-                except ValueError:
-                    solr_value = datetime.strptime(solr_value, DATETIME_FORMAT_NO_MICRO)
-            elif solr_value is not None and isinstance(field, SolrJsonField):
-                if field.model:
-                    for count, value in enumerate(solr_value):
-                        data = json.loads(value)
-                        solr_value[count] = field.model.from_json(data)
-                else:
-                    solr_value = json.loads(solr_value)
-            setattr(new_instance, attribute_name, solr_value)
-        doc_id = doc.get("id", None)
-        # remove prefix from id (entity_name_)
-        if doc_id:
-            start_index = len(self.entity_name) + 1
-            doc_id = doc_id[start_index:]
-        setattr(new_instance, "id", doc_id)
-        return new_instance
+    def get_fl(self, fields: List[str]) -> str:
+        """
+        Build the solr fl parameter for a list of attributes names
+        @param fields: list of attributes names
+        @return: comma separated list of solr fields, always containing the id
+        """
+        solr_fields = self.class_object._solr_fields
+        return ",".join(
+            ["id"]
+            + [
+                self.entity_name + "_" + solr_fields[attribute_name].name
+                for attribute_name in fields
+                if attribute_name in solr_fields
+            ]
+        )
 
-    def get_or_404(self, entity_id: str) -> Union[SolrEntity, Response]:
+    def _build_instance(self, doc, fields: List[str] = None):
+        """
+        Build a self.class_object instance from a solr document
+        @param doc: the solr document
+        @param fields: if set, only these attributes are set on the instance, see PartialEntitiesLoader
+        @return: the new instance
+        """
+        return self.decoder.decode(doc, fields)
+
+    def get_or_404(
+        self, entity_id: str, prefetch: List[str] = None
+    ) -> Union[SolrEntity, Response]:
         """
         Similar as get method but returns a 404 page if entity not found
         @param entity_id: id of the entity to retrieve from solr
+        @param prefetch: relationships to resolve, see prefetch method
         @return: a self.class_object instance or a 404 response if not found
         """
-        new_instance = self.get(entity_id)
+        new_instance = self.get(entity_id, prefetch=prefetch)
         if new_instance is None:
             abort(404)
         return new_instance
@@ -352,35 +769,172 @@ class SolrQuery(object):
         Total number of entities from solr
         @return: total count of entities as an integer
         """
-        results = self.solr_orm.indexer.search(
-            q="type:" + self.entity_name, fl="numFound"
+        results = self.solr_orm.search(
+            q="type:" + self.entity_name,
+            fl="numFound",
+            operation="count",
+            entity=self.entity_name,
         )
         return results.hits
 
     def all(self) -> List[SolrEntity]:
         """
         Retrieve from solr all the entities of the underlying SolrEntity as defined by self.class_object
+        Prefer iter_all for large indexes as this method holds all the entities in memory
         @return: a list of solr entities
         """
-        # TODO, use pagination and yield results
-        results = self.solr_orm.indexer.search(
-            q="type:" + self.entity_name, rows=1000000
-        )
-        instances = []
-        for result in results:
-            instances.append(self._build_instance(result))
-        return instances
+        return list(self.iter_all())
 
-    def all_ids(self) -> List[SolrEntity]:
+    def iter_all(
+        self, batch_size: int = DEFAULT_BATCH_SIZE, fields: List[str] = None
+    ) -> Generator[SolrEntity, None, None]:
+        """
+        Generator yielding all the entities of the underlying SolrEntity as defined by self.class_object
+        Uses solr deep paging (cursorMark) so that only one batch of documents is held in memory at a time
+        @param batch_size: number of documents retrieved per request
+        @param fields: list of attributes names to retrieve, all the stored fields are retrieved if None,
+        the other attributes are loaded on first access for the whole batch, see PartialEntitiesLoader
+        @return: a generator of solr entities
+        """
+        if fields is None:
+            for doc in self._iter_docs(batch_size):
+                yield self.decoder.decode(doc)
+            return
+        docs = []
+        for doc in self._iter_docs(batch_size, self.get_fl(fields)):
+            docs.append(doc)
+            if len(docs) == batch_size:
+                yield from self._decode_partial_batch(docs, fields)
+                docs = []
+        yield from self._decode_partial_batch(docs, fields)
+
+    def _decode_partial_batch(
+        self, docs: List[dict], fields: List[str]
+    ) -> List[SolrEntity]:
+        entities = self.decoder.decode_many(docs, fields)
+        if entities:
+            PartialEntitiesLoader(self, entities, fields)
+        return entities
+
+    def all_ids(self) -> List[str]:
         """
         Retrieve from solr all the entities  ids of the underlying SolrEntity as defined by self.class_object
-        @return: a list of solr entities
+        @return: a list of entities ids
         """
-        results = self.solr_orm.indexer.search(
-            q="type:" + self.entity_name, fl="id", rows=1000000
-        )
         start_index = len(self.entity_name) + 1
-        return [r["id"][start_index:] for r in results.docs]
+        return [
+            doc["id"][start_index:]
+            for doc in self._iter_docs(DEFAULT_BATCH_SIZE, fl="id")
+        ]
+
+    def all_ids_set(self) -> FrozenSet[str]:
+        """
+        Ids of all the entities of the underlying SolrEntity, for membership tests
+        The set is kept in memory until the next commit of any process sharing the index generation
+        @return: a frozenset of entities ids
+        """
+        return self.solr_orm.ids_set(self.entity_name, self.all_ids)
+
+    def _iter_docs(
+        self,
+        batch_size: int,
+        fl: Optional[str] = None,
+        q: Optional[str] = None,
+        fq: Optional[List[str]] = None,
+        cached: bool = False,
+    ) -> Generator[dict, None, None]:
+        """
+        Generator yielding raw solr documents batch by batch,
+        by default all the documents of the underlying entity type
+        see https://solr.apache.org/guide/8_4/pagination-of-results.html
+        (fetching a large number of sorted results: cursors)
+        @param batch_size: number of documents retrieved per request
+        @param fl: comma separated list of solr fields to retrieve
+        @param q: solr query string, default to all the documents of the underlying entity type
+        @param fq: list of filters to apply
+        @param cached: use the query cache, see SolrORM.search. Avoid it when iterating over a whole entity type
+        """
+        q = q or "type:" + self.entity_name
+        params = {"sort": "id asc", "rows": batch_size, "cursorMark": "*"}
+        if fl:
+            params["fl"] = fl
+        if fq:
+            params["fq"] = fq
+        while True:
+            try:
+                if cached:
+                    results = self.solr_orm.search(
+                        q, operation="iter", entity=self.entity_name, **params
+                    )
+                else:
+                    with track("solr", "iter", self.entity_name):
+                        results = self.solr_orm.indexer.search(q, **params)
+            except SolrError as e:
+                raise SolrQueryException(e)
+            for doc in results.docs:
+                yield doc
+            next_cursor_mark = results.nextCursorMark
+            # solr returns the same cursor mark when there are no more results
+            if not results.docs or next_cursor_mark == params["cursorMark"]:
+                break
+            params["cursorMark"] = next_cursor_mark
+
+
+class PartialEntitiesLoader(object):
+    """
+    Loads the attributes missing from entities built from partial solr documents.
+    The first access to a missing attribute of any of the entities triggers a single request
+    retrieving the missing fields for all of them.
+    """
+
+    def __init__(
+        self, query: SolrQuery, entities: List[SolrEntity], fields: List[str]
+    ) -> None:
+        """
+        Initialize a PartialEntitiesLoader and attach it to the entities
+        @param query: SolrQuery instance of the entities class
+        @param entities: entities built from partial documents
+        @param fields: attributes already loaded
+        """
+        self.query = query
+        self.entities = entities
+        self.missing_fields = [
+            attribute_name
+            for attribute_name in query.class_object._solr_fields
+            if attribute_name not in fields
+        ]
+        for entity in entities:
+            entity.__dict__["_loader"] = self
+
+    def load(self) -> None:
+        """
+        Retrieve the missing fields and set them on all the entities
+        """
+        entities = {}
+        for entity in self.entities:
+            entity.__dict__.pop("_loader", None)
+            entities[entity.id] = entity
+        if not entities or not self.missing_fields:
+            return
+        logger.debug(
+            "loading missing fields for %d %s entities",
+            len(entities),
+            self.query.entity_name,
+        )
+        docs = self.query._get_docs(
+            list(entities), fl=self.query.get_fl(self.missing_fields)
+        )
+        loaded = {
+            full_entity.id: full_entity
+            for full_entity in self.query.decoder.decode_many(docs, self.missing_fields)
+        }
+        for entity_id, entity in entities.items():
+            full_entity = loaded.get(entity_id)
+            for attribute_name in self.missing_fields:
+                value = (
+                    full_entity.__dict__.get(attribute_name) if full_entity else None
+                )
+                entity.__dict__.setdefault(attribute_name, value)
 
 
 class SolrAutomaticQuery(SolrQuery):
@@ -418,6 +972,8 @@ class SolrORM(object):
 
     # default field to use for default search
     DEFAULT_QUERY_FIELDS = ["title"]
+    # operations supported by update_entity_fields
+    ATOMIC_OPERATIONS = ["set", "add", "add-distinct", "remove", "removeregex", "inc"]
 
     def __init__(self, url: str, collection: str) -> None:
         """
@@ -427,14 +983,33 @@ class SolrORM(object):
         """
         self.url = url
         self.collection = collection
-        self.indexer = Solr("{}/{}".format(url, collection))
+        # all the requests to solr share the connections pool of this session
+        self.session = SolrSession.from_config(app.config)
+        self.indexer = Solr(
+            "{}/{}".format(url, collection), timeout=self.session.timeout
+        )
+        self.indexer.session = self.session
         self.indexer_schema = SolrSchemaAdmin(
-            "{}/{}/schema".format(self.url, collection)
+            "{}/{}/schema".format(self.url, collection), self.session
+        )
+        # responses of the read requests, valid until the next commit or SOLR_CACHE_MAX_AGE, see search
+        self.generation = IndexGeneration.from_config(app.config, collection)
+        self.query_cache = QueryCache(
+            app.config.get("SOLR_QUERY_CACHE_SIZE", DEFAULT_QUERY_CACHE_SIZE)
         )
         logger.info(
             "Initializing SolrORM with solr url %s and collection %s", url, collection
         )
 
+        # number of documents per entity type, see counts
+        self._counts = None
+        self._counts_time = 0
+        self._counts_generation = None
+        self._counts_lock = threading.Lock()
+        # ids of the entities per entity type, see ids_set
+        self._ids_sets = {}
+        self._ids_sets_lock = threading.Lock()
+
         SolrEntity._solr_orm = self
 
         # we loop over solr entity subclasses to set some internal variables
@@ -465,31 +1040,71 @@ class SolrORM(object):
                 entity_class.query = entity_class.query_class(entity_class, self)
             else:
                 entity_class.query = SolrQuery(entity_class, self)
-        pass
+        # reversed fields are only complete once all the classes have been processed
+        for entity_class in SolrEntity.__subclasses__():
+            self._create_relationship_accessors(entity_class)
+
+    @staticmethod
+    def _create_relationship_accessors(entity_class: Type[SolrEntity]) -> None:
+        """
+        Set on the SolrEntity subclass the descriptors resolving the linked entities:
+            - <attribute>_entities for each SolrForeignKeyField
+            - <reversed_by>_entity and <reversed_by>_entities for each reversed relationship
+        @param entity_class: SolrEntity subclass
+        """
+        accessors = []
+        for attribute_name, field in entity_class._solr_fields.items():
+            if isinstance(field, SolrForeignKeyField):
+                accessors.append(
+                    ForeignKeyAccessor(
+                        attribute_name + "_entities",
+                        attribute_name,
+                        field.linked_entity_name,
+                    )
+                )
+        for reversed_name, info in entity_class.reversed_field.items():
+            source_entity_name, field_name, reversed_multiple = info
+            for suffix in ["_entity", "_entities"]:
+                accessors.append(
+                    ReversedRelationshipAccessor(
+                        reversed_name + suffix,
+                        source_entity_name,
+                        field_name,
+                        reversed_multiple,
+                    )
+                )
+        for accessor in accessors:
+            existing = getattr(entity_class, accessor.name, None)
+            # never override attributes explicitly defined on the entity class
+            if existing is None or isinstance(existing, RelationshipAccessor):
+                setattr(entity_class, accessor.name, accessor)
+
+    def validate_schema(self, entity_name: str) -> SchemaValidationReport:
+        """
+        Compare the fields needed by an entity with the solr schema
+        The schema is retrieved with a single request and reused until it is modified
+        @param entity_name: name of the entity, e.g. dataset
+        @return: the validation report listing missing fields, type and flag mismatches
+        """
+        entity_class = app.config["entities"][entity_name.lower()]
+        plan = self.get_schema_plan([entity_class])
+        report = plan.validate(self.indexer_schema.get_schema(cached=True))
+        for line in report.lines():
+            logger.warning(line)
+        return report
 
     def check_schema(self, entity_name: str) -> bool:
         """
         Check for missing fields for each entity
         """
         try:
-            entity_class = app.config["entities"][entity_name.lower()]
-            if entity_class.__name__.lower() == entity_name.lower() and hasattr(
-                entity_class, "_solr_fields"
-            ):
-                fields = entity_class._solr_fields
-                for field in fields.values():
-                    ret = requests.get(
-                        f"{self.indexer_schema.url}/fields/{entity_name.lower()}_{field.name}"
-                    )
-                    if not ret.ok:
-                        logger.error(
-                            "The field %s is required.",
-                            field.name,
-                        )
-                        return False
-                return True
+            report = self.validate_schema(entity_name)
         except KeyError as e:
             logger.error(e)
+            return False
+        for field_name in report.missing_fields:
+            logger.error("The field %s is required.", field_name)
+        return not report.missing_fields
 
     def check_fields_existence(self) -> bool:
         """
@@ -504,68 +1119,120 @@ class SolrORM(object):
                 if field_name.startswith(entity_name):
                     return field_name
 
-        ret = requests.get(self.indexer_schema.url + "/fields")
-        for field in ret.json()["fields"]:
+        schema = self.indexer_schema.get_schema(cached=True)
+        for field in schema["fields"]:
             if get_field(field["name"]):
                 return True
 
     def field_type_mismatch(self, entity_name: str) -> bool:
-        for field in app.config["entities"].get(entity_name)._solr_fields.values():
-            ret = requests.get(
-                f"{self.indexer_schema.url}/fields/{entity_name.lower()}_{field.name}"
-            )
-            return ret.json()["field"]["type"] != field.type
+        """
+        Check if the type of one of the fields of an entity is different in solr
+        @param entity_name: name of the entity, e.g. dataset
+        @return: true if at least one type is different
+        """
+        return bool(self.validate_schema(entity_name).type_mismatches)
 
-    def create_fields(self):
+    def create_fields(self, dry_run: bool = False) -> Dict[str, List[dict]]:
         """
         We loop over solr entity subclasses to create the corresponding fields
+        Only the differences with the current schema are sent, in a single request
+        @param dry_run: if true, the changes are computed but not applied
+        @return: the schema commands, see SolrSchemaPlan.diff
         """
         logger.info("Creating solr fields")
-        self._create_or_update_fields(update=False)
+        return self.sync_schema(dry_run)
 
-    def update_fields(self):
+    def update_fields(self, dry_run: bool = False) -> Dict[str, List[dict]]:
         """
         We loop over solr entity subclasses to update the corresponding fields
+        Only the differences with the current schema are sent, in a single request
+        @param dry_run: if true, the changes are computed but not applied
+        @return: the schema commands, see SolrSchemaPlan.diff
         """
         logger.info("Updating solr fields")
-        self._create_or_update_fields(update=True)
+        return self.sync_schema(dry_run)
 
-    def delete_fields(self):
+    def sync_schema(self, dry_run: bool = False) -> Dict[str, List[dict]]:
+        """
+        Compare the schema plan of the entities with one snapshot of the solr schema
+        and apply the differences with a single schema request
+        @param dry_run: if true, the changes are computed but not applied
+        @return: the schema commands, see SolrSchemaPlan.diff
+        """
+        plan = self.get_schema_plan(app.config["entities"].values())
+        commands = plan.diff(self.indexer_schema.get_schema())
+        if not dry_run:
+            self.indexer_schema.apply(commands)
+        return commands
+
+    def delete_fields(self, dry_run: bool = False) -> Dict[str, List[dict]]:
         """
         We loop over solr entity subclasses to delete the corresponding fields
+        All the fields and copy fields are deleted with a single schema request
+        @param dry_run: if true, the changes are computed but not applied
+        @return: the schema commands, see SolrSchemaPlan.removal
         """
-        # get subclasses
         logger.info("Deleting solr fields")
-        for solr_entity_class in SolrEntity.__subclasses__():
-            # fields = self.get_fields_for_class(solr_entity_class)
-            if not hasattr(solr_entity_class, "_solr_fields"):
-                solr_entity_class._solr_fields = self.get_fields_for_class(
-                    solr_entity_class
+        plan = self.get_schema_plan(SolrEntity.__subclasses__())
+        commands = plan.removal(self.indexer_schema.get_schema())
+        if not dry_run:
+            self.indexer_schema.apply(commands)
+        return commands
+
+    def get_schema_plan(self, entity_classes) -> SolrSchemaPlan:
+        """
+        Build the description of the fields needed by some entities: a field per SolrField,
+        the _text_, _textfuzzy_ and _autocomplete_text_ fields used for the default search and the suggestions
+        and the copy fields feeding them
+        @param entity_classes: SolrEntity subclasses
+        @return: the schema plan
+        """
+        plan = SolrSchemaPlan()
+        plan.add_field("type", "string", indexed=True, stored=True)
+        plan.add_field_type(
+            {
+                "name": "autocomplete_text",
+                "class": "solr.TextField",
+                "positionIncrementGap": "100",
+                "analyzer": {
+                    "tokenizer": {"class": "solr.KeywordTokenizerFactory"},
+                    "filters": [{"class": "solr.LowerCaseFilterFactory"}],
+                },
+            }
+        )
+        for entity_class in entity_classes:
+            if not hasattr(entity_class, "_solr_fields"):
+                entity_class._solr_fields = self.get_fields_for_class(entity_class)
+            entity_name = entity_class.__name__.lower()
+            for field in entity_class._solr_fields.values():
+                plan.add_field(
+                    entity_name + "_" + field.name,
+                    field.type,
+                    field.indexed,
+                    field.stored,
+                    field.multivalued,
                 )
-            self._delete_fields_for_class(solr_entity_class)
-        try:
-            self.indexer_schema.delete_field("type")
-        except HTTPError as e:
-            logger.debug(e)
-
-    def _create_or_update_fields(self, update=False):
-        # get subclasses
-        if not update:
-            self.indexer_schema.create_field(
-                "type", "string", index=True, store=True, multivalued=False
+            text_fields = [
+                (entity_name + "_text_", "text_en"),
+                (entity_name + "_textfuzzy_", "text_en_splitting_tight"),
+                (entity_name + "_autocomplete_text_", "autocomplete_text"),
+            ]
+            solr_query_fields = app.config.get("SOLR_QUERY_TEXT_FIELD", {}).get(
+                entity_name
             )
-        for solr_entity_class in app.config["entities"].values():
-            logger.debug(solr_entity_class)
-            # fields = self.get_fields_for_class(solr_entity_class)
-            if not hasattr(solr_entity_class, "_solr_fields"):
-                solr_entity_class._solr_fields = self.get_fields_for_class(
-                    solr_entity_class
+            if not solr_query_fields:
+                solr_query_fields = self.DEFAULT_QUERY_FIELDS
+            for text_field_name, text_field_type in text_fields:
+                plan.add_field(
+                    text_field_name,
+                    text_field_type,
+                    indexed=True,
+                    stored=False,
+                    multivalued=True,
                 )
-            self._create_or_update_fields_for_class(solr_entity_class, update)
-        # self.indexer_schema.update_field("_text_", "text_en", index=True, store=False, multivalued=True)
-        # self.indexer_schema.update_field("_textfuzzy_", "text_en_splitting_tight", index=True, store=False,
-        #                                 multivalued=True)
-        logger.debug("done")
+                for source in solr_query_fields:
+                    plan.add_copy_field(entity_name + "_" + source, text_field_name)
+        return plan
 
     def get_fields_for_class(
         self, solr_entity_class: Type[SolrEntity]
@@ -588,205 +1255,40 @@ class SolrORM(object):
             if superclass != object:
                 self._find_fields(superclass, attributes)
 
-    def _create_or_update_fields_for_class(self, solr_entity_class, update):
-        fields = solr_entity_class._solr_fields
-        entity_name = solr_entity_class.__name__.lower()
-        solr_query_fields = app.config.get("SOLR_QUERY_TEXT_FIELD", {}).get(entity_name)
-        if not solr_query_fields:
-            solr_query_fields = self.DEFAULT_QUERY_FIELDS
-
-        for field in fields.values():
-            if update:
-                self.indexer_schema.update_field(
-                    entity_name + "_" + field.name,
-                    field.type,
-                    field.indexed,
-                    field.stored,
-                    field.multivalued,
-                )
-            else:
-                self.indexer_schema.create_field(
-                    entity_name + "_" + field.name,
-                    field.type,
-                    field.indexed,
-                    field.stored,
-                    field.multivalued,
-                )
-        try:
-            headers = {"Content-type": "application/json", "Content-Type": "text/xml"}
-            params = {"commit": "true", "indent": "true"}
-
-            data = {"delete-field": {"name": entity_name + "_text_"}}
-            requests.post(
-                self.indexer_schema.url,
-                headers=headers,
-                data=json.dumps(data),
-                params=params,
-            )
-            data = {"delete-field": {"name": entity_name + "_textfuzzy_"}}
-
-            requests.post(
-                self.indexer_schema.url,
-                headers=headers,
-                data=json.dumps(data),
-                params=params,
-            )
-
-            # Adding the Text field if it does not exists
-
-            data_add_copyfield = {
-                "add-field": {
-                    "name": entity_name + "_text_",
-                    "type": "text_en",
-                    "indexed": "true",
-                    "multiValued": "true",
-                    "stored": "false",
-                }
-            }
-            response_add_copyfield = requests.post(
-                self.indexer_schema.url,
-                headers=headers,
-                data=json.dumps(data_add_copyfield),
-                params=params,
-            )
-            data_add_copyfield2 = {
-                "add-field": {
-                    "name": entity_name + "_textfuzzy_",
-                    "type": "text_en_splitting_tight",
-                    "indexed": "true",
-                    "multiValued": "true",
-                    "stored": "false",
-                }
-            }
-            response_add_copyfield2 = requests.post(
-                self.indexer_schema.url,
-                headers=headers,
-                data=json.dumps(data_add_copyfield2),
-                params=params,
-            )
-
-            data_add_fieldtype = {
-                "add-field-type": {
-                    "name": "autocomplete_text",
-                    "class": "solr.TextField",
-                    "positionIncrementGap": "100",
-                    "analyzer": {
-                        "tokenizer": {"class": "solr.KeywordTokenizerFactory"},
-                        "filters": [{"class": "solr.LowerCaseFilterFactory"}],
-                    },
-                }
-            }
-            requests.post(
-                self.indexer_schema.url,
-                headers=headers,
-                data=json.dumps(data_add_fieldtype),
-                params=params,
-            )
+    @staticmethod
+    def _cache_key(q: str, params: dict) -> tuple:
+        items = []
+        for name, value in sorted(params.items()):
+            if isinstance(value, (list, tuple)):
+                value = tuple(value)
+            items.append((name, value))
+        return q, tuple(items)
 
-            data_add_copyfield3 = {
-                "add-field": {
-                    "name": entity_name + "_autocomplete_text_",
-                    "type": "autocomplete_text",
-                    "indexed": "true",
-                    "multiValued": "true",
-                    "stored": "false",
-                }
-            }
-            response_add_copyfield3 = requests.post(
-                self.indexer_schema.url,
-                headers=headers,
-                data=json.dumps(data_add_copyfield3),
-                params=params,
-            )
-
-            # if the text field exists but have copy fields attached. Deleting all the copy fields
-            if not response_add_copyfield.status_code == 200:
-                for source in solr_query_fields:
-                    data_delete_copyfield = {
-                        "delete-copy-field": {
-                            "source": entity_name + "_" + source,
-                            "dest": entity_name + "_text_",
-                        }
-                    }
-                    requests.post(
-                        self.indexer_schema.url,
-                        headers=headers,
-                        params=params,
-                        data=json.dumps(data_delete_copyfield),
-                    )
-
-            if not response_add_copyfield2.status_code == 200:
-                for source in solr_query_fields:
-                    data_delete_copyfield2 = {
-                        "delete-copy-field": {
-                            "source": entity_name + "_" + source,
-                            "dest": entity_name + "_textfuzzy_",
-                        }
-                    }
-                    requests.post(
-                        self.indexer_schema.url,
-                        headers=headers,
-                        params=params,
-                        data=json.dumps(data_delete_copyfield2),
-                    )
-
-            if not response_add_copyfield3.status_code == 200:
-                for source in solr_query_fields:
-                    data_delete_copyfield3 = {
-                        "delete-copy-field": {
-                            "source": entity_name + "_" + source,
-                            "dest": entity_name + "_autocomplete_text_",
-                        }
-                    }
-                    requests.post(
-                        self.indexer_schema.url,
-                        headers=headers,
-                        params=params,
-                        data=json.dumps(data_delete_copyfield3),
-                    )
-
-            # recreating all the copy fields with _text_ and _textfuzzy_ as dest field
-            for source in solr_query_fields:
-                data_create_copyfield = {
-                    "add-copy-field": {
-                        "source": entity_name + "_" + source,
-                        "dest": entity_name + "_text_",
-                    }
-                }
-                requests.post(
-                    self.indexer_schema.url,
-                    headers=headers,
-                    params=params,
-                    data=json.dumps(data_create_copyfield),
-                )
-                data_create_copyfield2 = {
-                    "add-copy-field": {
-                        "source": entity_name + "_" + source,
-                        "dest": entity_name + "_textfuzzy_",
-                    }
-                }
-                requests.post(
-                    self.indexer_schema.url,
-                    headers=headers,
-                    params=params,
-                    data=json.dumps(data_create_copyfield2),
-                )
-
-                data_create_copyfield3 = {
-                    "add-copy-field": {
-                        "source": entity_name + "_" + source,
-                        "dest": entity_name + "_autocomplete_text_",
-                    }
-                }
-                requests.post(
-                    self.indexer_schema.url,
-                    headers=headers,
-                    params=params,
-                    data=json.dumps(data_create_copyfield3),
-                )
-
-        except requests.exceptions.HTTPError as e:
-            print(e)
+    def search(
+        self, q: str, operation: str = "search", entity: str = "", **params
+    ) -> pysolr.Results:
+        """
+        Same as pysolr.Solr.search but the responses are cached until the next commit of the index
+        or for at most SOLR_CACHE_MAX_AGE seconds, see IndexGeneration and QueryCache.
+        The cache size is set by SOLR_QUERY_CACHE_SIZE, 0 disables it
+        @param q: solr query string
+        @param operation: name of the calling method, used as metrics label
+        @param entity: entity type searched, used as metrics label
+        @param params: other parameters of the request
+        @return: a new pysolr.Results instance
+        """
+        key = self._cache_key(q, params)
+        generation = self.generation.current()
+        raw_response = self.query_cache.get(generation, key)
+        if raw_response is not None:
+            SOLR_QUERY_CACHE.labels(operation, entity, "hit").inc()
+            return pysolr.Results(raw_response)
+        SOLR_QUERY_CACHE.labels(operation, entity, "miss").inc()
+        with track("solr", operation, entity):
+            results = self.indexer.search(q, **params)
+        observe_qtime(operation, entity, results)
+        self.query_cache.set(generation, key, results.raw_response)
+        return results
 
     def add(self, entity_dict: dict) -> str:
         """
@@ -795,7 +1297,80 @@ class SolrORM(object):
         @param entity_dict: a representation of a SolrEntity as a dict
         @return: a string containing the response body from solr
         """
-        return self.indexer.add([entity_dict])
+        with track("solr", "add", entity_dict.get("type", "")):
+            return self.indexer.add([entity_dict])
+
+    def build_update(
+        self, entity_id: str, fields: dict, op: str = "set", version: int = None
+    ) -> dict:
+        """
+        Build an atomic update document, see https://solr.apache.org/guide/8_4/updating-parts-of-documents.html
+        @param entity_id: solr id of the document to update, with prefix
+        @param fields: dict of solr field names, with prefix, and values
+        @param op: the update operation applied to all the fields, see ATOMIC_OPERATIONS
+        @param version: if set, the update is rejected if the _version_ of the document in solr is different
+        @return: the update document
+        """
+        if op not in self.ATOMIC_OPERATIONS:
+            raise ValueError(f"unknown atomic update operation {op}")
+        update = {"id": entity_id}
+        for field_name, value in fields.items():
+            update[field_name] = {op: value}
+        if version is not None:
+            update["_version_"] = version
+        return update
+
+    def update_entity_fields(
+        self,
+        entity_id: str,
+        fields: dict,
+        op: str = "set",
+        version: int = None,
+        commit: bool = False,
+    ) -> str:
+        """
+        Update some fields of an entity with a solr atomic update, the other fields are kept
+        Beware that this method doesn't trigger a commit unless asked to
+        @param entity_id: solr id of the document to update, with prefix
+        @param fields: dict of solr field names, with prefix, and values
+        @param op: set, add, add-distinct, remove or inc
+        @param version: optional _version_ of the document for optimistic concurrency
+        @param commit: trigger a commit with the update
+        @return: a string containing the response body from solr
+        """
+        body = json.dumps(
+            [self.build_update(entity_id, fields, op, version)], default=to_solr_value
+        )
+        path = "update/?wt=json"
+        if commit:
+            path += "&commit=true"
+        try:
+            response = self.indexer._send_request(
+                "post", path, body, {"Content-type": "application/json"}
+            )
+        except SolrError as e:
+            if "HTTP 409" in str(e):
+                raise SolrVersionConflictException(e)
+            raise
+        if commit:
+            self.generation.bump()
+            self.invalidate_counts()
+        return response
+
+    def pool_stats(self) -> dict:
+        """
+        Statistics of the connections pool used for the requests to solr, see SolrSession.stats
+        @return: dict of statistics
+        """
+        return self.session.stats()
+
+    def writer(self, **kwargs) -> SolrIndexWriter:
+        """
+        Create a SolrIndexWriter to index documents in bulk
+        @param kwargs: see SolrIndexWriter
+        @return: a new SolrIndexWriter instance
+        """
+        return SolrIndexWriter(self, **kwargs)
 
     def delete(self, entity_id: str = None, query: SolrQuery = None) -> str:
         """
@@ -815,62 +1390,190 @@ class SolrORM(object):
         @return: a string containing the response body from solr
         """
         logger.debug("Solr commit")
-        return self.indexer.commit(softCommit=soft_commit)
+        with track("solr", "commit"):
+            result = self.indexer.commit(softCommit=soft_commit)
+        self.generation.bump()
+        self.invalidate_counts()
+        return result
 
-    def _delete_fields_for_class(self, entity_class):
-        fields = entity_class._solr_fields
-        entity_name = entity_class.__name__.lower()
-        solr_query_fields = app.config.get("SOLR_QUERY_TEXT_FIELD", {}).get(entity_name)
-        if not solr_query_fields:
-            solr_query_fields = self.DEFAULT_QUERY_FIELDS
-        headers = {"Content-type": "application/json", "Content-Type": "text/xml"}
-        params = {"commit": "true", "indent": "true"}
-        for source in solr_query_fields:
-            logger.debug("deleting copy field for %s", source)
-            data_delete_copyfield = {
-                "delete-copy-field": [
-                    {
-                        "source": entity_name + "_" + source,
-                        "dest": entity_name + "_text_",
-                    },
-                    {
-                        "source": entity_name + "_" + source,
-                        "dest": entity_name + "_textfuzzy_",
-                    },
-                    {
-                        "source": entity_name + "_" + source,
-                        "dest": entity_name + "_autocomplete_text_",
-                    },
-                ]
-            }
-            ret = requests.post(
-                self.indexer_schema.url,
-                headers=headers,
-                params=params,
-                data=json.dumps(data_delete_copyfield),
+    def counts(self) -> Dict[str, int]:
+        """
+        Number of documents per entity type, computed with a single facet query on the type field
+        The result is kept in memory until the next commit of any process sharing the index generation,
+        see IndexGeneration, and at most SOLR_COUNTS_CACHE_TIMEOUT seconds (default 60)
+        @return: dict of entity names and counts, types without documents are omitted
+        """
+        timeout = app.config.get("SOLR_COUNTS_CACHE_TIMEOUT", 60)
+        generation = self.generation.current()
+        with self._counts_lock:
+            if (
+                self._counts is not None
+                and self._counts_generation == generation
+                and time.monotonic() - self._counts_time < timeout
+            ):
+                return dict(self._counts)
+        try:
+            results = self.search(
+                "*:*",
+                operation="counts",
+                rows=0,
+                facet="on",
+                **{"facet.field": "type", "facet.limit": -1, "facet.mincount": 1},
             )
+        except SolrError as e:
+            raise SolrQueryException(e)
+        values = results.facets.get("facet_fields", {}).get("type", [])
+        counts = dict(zip(values[::2], values[1::2]))
+        with self._counts_lock:
+            self._counts = counts
+            self._counts_time = time.monotonic()
+            self._counts_generation = generation
+        return dict(counts)
+
+    def invalidate_counts(self) -> None:
+        """
+        Forget the counts computed by the counts method
+        """
+        with self._counts_lock:
+            self._counts = None
 
-            if not ret.ok:
-                logger.debug(ret.content)
-        data = {
-            "delete-field": [
-                {"name": entity_name + "_text_"},
-                {"name": entity_name + "_textfuzzy_"},
-                {"name": entity_name + "_autocomplete_text_"},
-            ]
+    def ids_set(
+        self, entity_name: str, all_ids: Callable[[], List[str]]
+    ) -> FrozenSet[str]:
+        """
+        Ids of all the entities of a type, retrieved once per index generation, see IndexGeneration
+        @param entity_name: name of the entity type, e.g. dataset
+        @param all_ids: function retrieving the ids from solr
+        @return: a frozenset of entities ids
+        """
+        generation = self.generation.current()
+        with self._ids_sets_lock:
+            cached = self._ids_sets.get(entity_name)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        ids = frozenset(all_ids())
+        with self._ids_sets_lock:
+            self._ids_sets[entity_name] = (generation, ids)
+        return ids
+
+    def global_search(
+        self,
+        query: str,
+        rows_per_type: int = 5,
+        entity_names: List[str] = None,
+        fuzzy: bool = False,
+    ) -> Dict[str, dict]:
+        """
+        Search all the entity types with a single request,
+        results are grouped by type, see https://solr.apache.org/guide/8_4/result-grouping.html
+        @param query: solr query string
+        @param rows_per_type: maximum number of entities returned per type, the best scores first
+        @param entity_names: types to search, default to all the entity types
+        @param fuzzy: boolean triggering fuzzy search to be active or not
+        @return: dict of entity names and dicts with the number of hits and the entities found
+        """
+        if entity_names is None:
+            entity_names = list(app.config["entities"])
+        entity_classes = {name: app.config["entities"][name] for name in entity_names}
+        query = query.strip()
+        q = "*:*"
+        if ":" in query:  # for queries like "dataset_disease:*corona*"
+            q = query
+        elif query:
+            clauses = []
+            for entity_name in entity_names:
+                clauses.append("{}_text_:'{}'".format(entity_name, query))
+                if fuzzy:
+                    clauses.append(
+                        "{}_textfuzzy_:{}{}".format(
+                            entity_name, query, FUZZY_SEARCH_SUFFIX
+                        )
+                    )
+            q = "({})".format(" OR ".join(clauses))
+        params = {
+            "defType": "edismax",
+            "qf": " ".join(
+                entity_class.query.BOOST
+                for entity_class in entity_classes.values()
+                if entity_class.query.BOOST
+            ),
+            "fq": "{!terms f=type}" + ",".join(entity_names),
+            "sort": "score desc",
+            # one group per type
+            "rows": len(entity_names),
+            "group": "true",
+            "group.field": "type",
+            "group.limit": rows_per_type,
         }
-        requests.post(
-            self.indexer_schema.url,
-            headers=headers,
-            data=json.dumps(data),
-            params=params,
-        )
+        try:
+            results = self.search(q, operation="global_search", **params)
+        except SolrError as e:
+            raise SolrQueryException(e)
+        found = {name: {"hits": 0, "entities": []} for name in entity_names}
+        for group in results.grouped.get("type", {}).get("groups", []):
+            entity_name = group["groupValue"]
+            if entity_name not in entity_classes:
+                continue
+            doclist = group["doclist"]
+            found[entity_name] = {
+                "hits": doclist["numFound"],
+                "entities": entity_classes[entity_name].query.decoder.decode_many(
+                    doclist["docs"]
+                ),
+            }
+        return found
 
-        for field in fields.values():
-            try:
-                self.indexer_schema.delete_field(entity_name + "_" + field.name)
-            except HTTPError as e:
-                logger.warning("error deleting field %s", field.name, exc_info=e)
+    def build_suggesters(self, entity_names: List[str] = None) -> None:
+        """
+        Build the autocomplete suggesters from the current index, see solr_config_update and suggest
+        To be called once the entities are imported and committed rather than on every suggest request
+        @param entity_names: build the suggesters of these entity types only, default to all the entity types
+        """
+        if entity_names is None:
+            entity_names = list(app.config["entities"])
+        for entity_name in entity_names:
+            logger.info("building suggester of entity %s", entity_name)
+            with track("solr", "build_suggester", entity_name):
+                self.indexer.search(
+                    "*:*",
+                    search_handler="suggest",
+                    **{
+                        "suggest.build": "true",
+                        "suggest.dictionary": f"suggest_{entity_name}",
+                    },
+                )
+        # the suggestions cached by all the processes are outdated
+        self.generation.bump()
+
+    def suggest(self, entity_name: str, prefix: str) -> List[str]:
+        """
+        Terms of the entities of a type matching a prefix, for the autocomplete of the search box
+        The suggesters must have been built with build_suggesters, responses are cached until the next commit
+        @param entity_name: name of the entity type, e.g. dataset
+        @param prefix: text typed by the user
+        @return: list of terms, the best ones first
+        """
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+        dictionary = f"suggest_{entity_name}"
+        try:
+            results = self.search(
+                "*:*",
+                operation="suggest",
+                entity=entity_name,
+                search_handler="suggest",
+                **{"suggest.dictionary": dictionary, "suggest.q": prefix},
+            )
+        except SolrError as e:
+            raise SolrQueryException(e)
+        suggestions = (
+            results.raw_response.get("suggest", {})
+            .get(dictionary, {})
+            .get(prefix, {})
+            .get("suggestions", [])
+        )
+        return [suggestion["term"] for suggestion in suggestions]
 
     def solr_config_update(self):
         headers = {"Content-type": "application/json"}
@@ -905,13 +1608,13 @@ class SolrORM(object):
         data_add_searchcomponent = {"add-searchcomponent": search_component}
 
         data_add_requesthandler = {"add-requesthandler": request_handler}
-        response_add_search_component = requests.post(
+        response_add_search_component = self.session.post(
             self.url + "/" + self.collection + "/config",
             headers=headers,
             params=params,
             data=json.dumps(data_add_searchcomponent),
         )
-        response_add_request_handler = requests.post(
+        response_add_request_handler = self.session.post(
             self.url + "/" + self.collection + "/config",
             headers=headers,
             params=params,
@@ -921,7 +1624,7 @@ class SolrORM(object):
         # if the component already exists do an update
         if not response_add_search_component.status_code == 200:
             data_update_search_component = {"update-searchcomponent": search_component}
-            requests.post(
+            self.session.post(
                 self.url + "/" + self.collection + "/config",
                 headers=headers,
                 params=params,
@@ -930,7 +1633,7 @@ class SolrORM(object):
 
         if not response_add_request_handler.status_code == 200:
             data_update_request_handler = {"update-requesthandler": request_handler}
-            requests.post(
+            self.session.post(
                 self.url + "/" + self.collection + "/config",
                 headers=headers,
                 params=params,
@@ -24,7 +24,7 @@ import json
 import logging
 import uuid
 from datetime import datetime
-from typing import Optional, Any
+from typing import Optional, Any, List
 
 from .solr_orm_fields import SolrDateTimeField, SolrField, SolrIntField, SolrJsonField
 from .. import app
@@ -38,6 +38,163 @@ DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 DATETIME_FORMAT_NO_MICRO = "%Y-%m-%dT%H:%M:%SZ"
 
 
+def get_field_value(instance: "SolrEntity", attribute_name: str) -> Any:
+    """
+    Value of a solr field attribute of an instance, None if the attribute has never been set
+    """
+    value = getattr(instance, attribute_name, None)
+    if isinstance(value, SolrField):
+        return None
+    return value
+
+
+class RelationshipAccessor:
+    """
+    Base descriptor giving access to the entities linked to a SolrEntity instance
+    Resolved entities are memoized on the instance, the cache is invalidated when the entity is saved
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Optional["SolrEntity"], owner: type) -> Any:
+        if instance is None:
+            return self
+        cache = instance.__dict__.setdefault("_relationships_cache", {})
+        cache_key = self.cache_key(instance)
+        cached = cache.get(self.name)
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+        value = self.resolve(instance)
+        cache[self.name] = (cache_key, value)
+        return value
+
+    def prime(self, instance: "SolrEntity", value: Any) -> None:
+        """
+        Store already resolved entities in the instance cache
+        @param instance: the SolrEntity instance
+        @param value: the linked entities
+        """
+        cache = instance.__dict__.setdefault("_relationships_cache", {})
+        cache[self.name] = (self.cache_key(instance), value)
+
+    def prefetch(self, instances: List["SolrEntity"]) -> List["SolrEntity"]:
+        """
+        Resolve the linked entities of all the instances with one batched query and prime their caches
+        @param instances: SolrEntity instances of the class holding the descriptor
+        @return: the distinct linked entities
+        """
+        raise NotImplementedError
+
+    def cache_key(self, instance: "SolrEntity") -> Any:
+        """
+        Value identifying the state of the instance the cached entities were resolved for
+        """
+        return instance.id
+
+    def resolve(self, instance: "SolrEntity") -> Any:
+        raise NotImplementedError
+
+
+class ForeignKeyAccessor(RelationshipAccessor):
+    """
+    Descriptor resolving the entities referenced by a SolrForeignKeyField, e.g. project.studies_entities
+    """
+
+    def __init__(self, name: str, attribute_name: str, linked_entity_name: str) -> None:
+        super().__init__(name)
+        self.attribute_name = attribute_name
+        self.linked_entity_name = linked_entity_name
+
+    def cache_key(self, instance: "SolrEntity") -> Any:
+        entities_ids = get_field_value(instance, self.attribute_name)
+        if isinstance(entities_ids, list):
+            return tuple(entities_ids)
+        return entities_ids
+
+    def resolve(self, instance: "SolrEntity") -> list:
+        entities_ids = get_field_value(instance, self.attribute_name)
+        if not entities_ids:
+            return []
+        linked_entity_class = app.config["entities"][self.linked_entity_name]
+        return linked_entity_class.query.get_many(entities_ids)
+
+    def prefetch(self, instances: List["SolrEntity"]) -> List["SolrEntity"]:
+        all_ids = []
+        for instance in instances:
+            all_ids.extend(self._get_ids(instance))
+        linked_entity_class = app.config["entities"][self.linked_entity_name]
+        linked_entities = {
+            entity.id: entity for entity in linked_entity_class.query.get_many(all_ids)
+        }
+        for instance in instances:
+            self.prime(
+                instance,
+                [
+                    linked_entities[entity_id]
+                    for entity_id in self._get_ids(instance)
+                    if entity_id in linked_entities
+                ],
+            )
+        return list(linked_entities.values())
+
+    def _get_ids(self, instance: "SolrEntity") -> List[str]:
+        entities_ids = get_field_value(instance, self.attribute_name) or []
+        if isinstance(entities_ids, str):
+            return [entities_ids]
+        return entities_ids
+
+
+class ReversedRelationshipAccessor(RelationshipAccessor):
+    """
+    Descriptor resolving the entities holding a reference to an instance, e.g. study.project_entity
+    """
+
+    def __init__(
+        self,
+        name: str,
+        source_entity_name: str,
+        field_name: str,
+        reversed_multiple: bool,
+    ) -> None:
+        super().__init__(name)
+        self.source_entity_name = source_entity_name
+        self.field_name = field_name
+        self.reversed_multiple = reversed_multiple
+
+    def resolve(self, instance: "SolrEntity") -> Any:
+        source_entity_class = app.config["entities"].get(self.source_entity_name)
+        holding_entities = source_entity_class.query.search_holding_entities(
+            field_name=self.field_name,
+            target_entity_id=instance.id,
+            source_entity_type=self.source_entity_name,
+        ).entities
+        return self._to_value(holding_entities)
+
+    def prefetch(self, instances: List["SolrEntity"]) -> List["SolrEntity"]:
+        source_entity_class = app.config["entities"].get(self.source_entity_name)
+        holding_entities = source_entity_class.query.search_holding_entities_many(
+            field_name=self.field_name,
+            target_entity_ids=[instance.id for instance in instances],
+            source_entity_type=self.source_entity_name,
+        )
+        holding_by_target = {}
+        for holding_entity in holding_entities:
+            targets = get_field_value(holding_entity, self.field_name) or []
+            if isinstance(targets, str):
+                targets = [targets]
+            for target_id in targets:
+                holding_by_target.setdefault(target_id, []).append(holding_entity)
+        for instance in instances:
+            self.prime(instance, self._to_value(holding_by_target.get(instance.id, [])))
+        return holding_entities
+
+    def _to_value(self, holding_entities: List["SolrEntity"]) -> Any:
+        if self.reversed_multiple or not holding_entities:
+            return holding_entities
+        return holding_entities[0]
+
+
 class SolrEntity:
     """
     Base class for a solr entity
@@ -50,6 +207,12 @@ class SolrEntity:
     former_ids = SolrField("former_ids", multivalued=True, indexed=False)
     connector_name = SolrField("connector_name", multivalued=False, indexed=False)
 
+    # relationships resolved in batch when the entity is displayed on its details page
+    # e.g. ["studies", "studies.datasets"], see SolrQuery.prefetch
+    DEFAULT_PREFETCH = []
+    # attributes displayed on the search results page, None to retrieve all the fields
+    # other attributes are loaded on access
+    SEARCH_FIELDS = None
     # dict holding reverse foreign keys references
     reversed_field = {}
     query = None
@@ -83,7 +246,8 @@ class SolrEntity:
     def __getattr__(self, attribute: str) -> Any:
         """
         check if we have foreign key reference and resolve it if it's the case
-        @todo: ADD caching
+        Relationships known when the SolrORM is initialized are resolved by RelationshipAccessor descriptors,
+        this method is only used as a fallback
         @param attribute: name of the attribute
         @return: list of entities if many to many relationship
         """
@@ -115,9 +279,8 @@ class SolrEntity:
                     # get foreign entity type
                     linked_entity_name = self._solr_fields[prefix].linked_entity_name
                     linked_entity_class = app.config["entities"][linked_entity_name]
-                    for entity_id in entities_ids:
-                        linked_entity = linked_entity_class.query.get(entity_id)
-                        results.append(linked_entity)
+                    # all linked entities are retrieved with a single request
+                    results = linked_entity_class.query.get_many(entities_ids)
             return results
         raise AttributeError(
             "'{}' object has no attribute '{}'".format(
@@ -125,36 +288,95 @@ class SolrEntity:
             )
         )
 
-    def save(self, commit=False) -> str:
+    def to_solr_document(self) -> dict:
         """
-        Create dict representation of the entity instance and index it in solr
-        Beware that this method doesn't trigger a commit
-        @return: a string containing the solr response body
+        Create the document representing the entity instance in solr, prefixed id and type included
+        @return: dict representation of the entity instance as indexed in solr
         """
         entity_dict = self.to_dict()
         entity_type = self.__class__.__name__.lower()
         entity_dict["id"] = entity_type + "_" + entity_dict["id"]
         entity_dict["type"] = entity_type
-        logger.info("Indexing entity %s (%s)", self.id, entity_type)
+        return entity_dict
+
+    def save(
+        self,
+        commit=False,
+        writer=None,
+        only: Optional[List[str]] = None,
+        check_version: bool = False,
+    ) -> Optional[str]:
+        """
+        Create dict representation of the entity instance and index it in solr
+        Beware that this method doesn't trigger a commit
+        @param commit: trigger a commit after indexing, ignored if writer is set
+        @param writer: SolrIndexWriter instance, if set the document is buffered and sent in bulk by the writer
+        @param only: if set, only these attributes are sent to solr with an atomic update,
+         see SolrORM.update_entity_fields
+        @param check_version: only with only, reject the update if the entity has been modified in solr since it was
+         retrieved, see SolrVersionConflictException
+        @return: a string containing the solr response body, None if a writer is used
+        """
+        if only is not None:
+            return self._save_fields(only, commit, writer, check_version)
+        entity_dict = self.to_solr_document()
+        entity_type = entity_dict["type"]
+        logger.debug("Indexing entity %s (%s)", self.id, entity_type)
         for field_name, info in self.reversed_field.items():
             source_entity_class_name, reversed_field_name, reversed_multiple = info
             field_value = getattr(self, field_name, None)
-            if field_value and self.id:
-                # get linked entity     from solr
+            if field_value and self.id and writer is not None:
+                # resolved by the writer with a single update per linked entity
+                writer.add_link(
+                    source_entity_class_name, field_value, reversed_field_name, self.id
+                )
+            elif field_value and self.id:
                 source_entity_class = app.config["entities"].get(
                     source_entity_class_name
                 )
-                source_entity = source_entity_class.query.get(field_value)
-                if source_entity:
-                    entities = getattr(source_entity, reversed_field_name, []) or []
-                    entities.append(self.id)
-                    setattr(source_entity, reversed_field_name, entities)
-                    source_entity.save()
+                # only the field holding the link is updated, if the linked entity exists
+                if source_entity_class.query._get_docs([field_value], fl="id"):
+                    key = source_entity_class_name + "_" + reversed_field_name
+                    self._solr_orm.update_entity_fields(
+                        source_entity_class_name + "_" + field_value,
+                        {key: [self.id]},
+                        op="add-distinct",
+                    )
+        # linked entities might have changed
+        self.__dict__.pop("_relationships_cache", None)
+        if writer is not None:
+            writer.add(entity_dict)
+            return None
         result_add = self._solr_orm.add(entity_dict)
         if commit:
             self._solr_orm.commit()
         return result_add
 
+    def _save_fields(
+        self,
+        attribute_names: List[str],
+        commit: bool,
+        writer,
+        check_version: bool,
+    ) -> Optional[str]:
+        entity_type = self.__class__.__name__.lower()
+        fields = {}
+        for attribute_name in attribute_names:
+            field = self._solr_fields[attribute_name]
+            fields[entity_type + "_" + field.name] = self._get_solr_value(
+                attribute_name, field
+            )
+        entity_id = entity_type + "_" + self.id.replace(" ", "_")
+        version = self.__dict__.get("_version_") if check_version else None
+        logger.debug("Updating fields %s of entity %s", attribute_names, entity_id)
+        self.__dict__.pop("_relationships_cache", None)
+        if writer is not None:
+            writer.add(self._solr_orm.build_update(entity_id, fields, version=version))
+            return None
+        return self._solr_orm.update_entity_fields(
+            entity_id, fields, version=version, commit=commit
+        )
+
     def to_dict(self, add_prefix=True) -> dict:
         """
         Create a dict containing all attributes as key and the field values as value
@@ -163,32 +385,40 @@ class SolrEntity:
         entity_dict = {}
         entity_type = self.__class__.__name__.lower()
         for attribute_name, field in self.__class__._solr_fields.items():
-            attribute_value = getattr(self, attribute_name, None)
-            if isinstance(attribute_value, SolrField):
-                attribute_value = None
             if add_prefix:
                 key = entity_type + "_" + field.name
             else:
                 key = field.name
-            if isinstance(field, SolrJsonField):
-                if field.model:
-                    if attribute_value is not None:
-                        for count, value in enumerate(attribute_value):
-                            attribute_value[count] = json.dumps(value.to_json())
-                else:
-                    attribute_value = json.dumps(attribute_value)
-            entity_dict[key] = attribute_value
+            entity_dict[key] = self._get_solr_value(attribute_name, field)
         if self.id is None or isinstance(self.id, SolrField):
             self.id = str(uuid.uuid1())
         entity_dict["id"] = self.id.replace(" ", "_")
         return entity_dict
 
+    def _get_solr_value(self, attribute_name: str, field: SolrField) -> Any:
+        attribute_value = getattr(self, attribute_name, None)
+        if isinstance(attribute_value, SolrField):
+            attribute_value = None
+        if isinstance(field, SolrJsonField):
+            if field.model:
+                if attribute_value is not None:
+                    attribute_value = [
+                        json.dumps(value.to_json()) for value in attribute_value
+                    ]
+            else:
+                attribute_value = json.dumps(attribute_value)
+        return attribute_value
+
     def to_api_dict(self) -> dict:
         """
         Similar to method to_dict but can be used to restrict the list of fields exported via api endpoints.
         @return: dict representation of the entity instance
         """
-        return self.__dict__
+        return {
+            key: value
+            for key, value in self.__dict__.items()
+            if not key.startswith("_")
+        }
 
     def delete(self) -> str:
         """
@@ -51,6 +51,24 @@ class SolrField:
         self.name = name
         self.type = field_type
         self.attribute_name = attribute_name or name
+        self.class_attribute_name = None
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.class_attribute_name = name
+
+    def __get__(self, instance: object, owner: type) -> object:
+        """
+        Only called when the attribute is not set on the instance.
+        For entities built from partial documents, trigger the loading of the missing fields.
+        """
+        if instance is None:
+            return self
+        loader = instance.__dict__.get("_loader")
+        if loader is not None:
+            loader.load()
+            if self.class_attribute_name in instance.__dict__:
+                return instance.__dict__[self.class_attribute_name]
+        return self
 
 
 class SolrCaseInsensitiveStringField(SolrField):
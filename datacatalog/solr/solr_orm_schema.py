@@ -18,10 +18,12 @@
     datacatalog.solr.solr_orm_schema
     -------------------
 
-   Module containing the SolrSchemaAdmin class
+   Module containing the SolrSchemaAdmin and SolrSchemaPlan classes
 
 """
+import json
 import logging
+from typing import Dict, List
 
 import requests
 
@@ -29,6 +31,9 @@ from .. import app
 
 logger = logging.getLogger(__name__)
 
+# value of the field properties not returned by solr, inherited from the field type
+FIELD_DEFAULTS = {"indexed": True, "stored": True, "multiValued": False}
+
 
 class SolrSchemaAdmin:
     """
@@ -36,8 +41,11 @@ class SolrSchemaAdmin:
     Create and delete fields
     """
 
-    def __init__(self, url):
+    def __init__(self, url, session: requests.Session = None):
         self.url = url
+        self.session = session or requests.Session()
+        # last schema snapshot, reset by the methods modifying the schema
+        self._schema = None
         self.solr_query_fields = app.config.get(
             "SOLR_QUERY_TEXT_FIELD",
             {"dataset": ["title"], "project": ["title"], "study": ["title"]},
@@ -87,7 +95,8 @@ class SolrSchemaAdmin:
                 "multiValued": multivalued,
             }
         }
-        ret = requests.post(self.url, json=json_create)
+        self._schema = None
+        ret = self.session.post(self.url, json=json_create)
         ret.raise_for_status()
 
     def update_field(
@@ -107,7 +116,8 @@ class SolrSchemaAdmin:
         @param multivalued: should the field be marked as multivalued
         """
         logger.debug("updating field %s", field_name)
-        ret = requests.post(
+        self._schema = None
+        ret = self.session.post(
             self.url,
             json={
                 "replace-field": {
@@ -128,5 +138,252 @@ class SolrSchemaAdmin:
         @return: raises an exception if not successful
         """
         logger.debug("deleting field %s", field_name)
-        ret = requests.post(self.url, json={"delete-field": {"name": field_name}})
+        self._schema = None
+        ret = self.session.post(self.url, json={"delete-field": {"name": field_name}})
+        ret.raise_for_status()
+
+    def get_schema(self, cached: bool = False) -> dict:
+        """
+        Retrieve the whole schema: fields, copy fields, field types... with a single request
+        @param cached: if true, reuse the last snapshot unless the schema has been modified since
+        @return: the schema as returned by solr
+        """
+        if cached and self._schema is not None:
+            return self._schema
+        ret = self.session.get(self.url)
         ret.raise_for_status()
+        self._schema = ret.json()["schema"]
+        return self._schema
+
+    def apply(self, commands: Dict[str, List[dict]]) -> None:
+        """
+        Send several schema commands in a single request, so that solr reloads the core only once
+        Solr applies all of them or none
+        @param commands: dict of commands name and definitions, see SolrSchemaPlan.diff
+        @return: raises an exception if not successful
+        """
+        if not commands:
+            logger.info("solr schema is up to date")
+            return
+        self._schema = None
+        logger.info(
+            "applying schema changes: %s",
+            ", ".join(f"{len(items)} {name}" for name, items in commands.items()),
+        )
+        ret = self.session.post(
+            self.url,
+            data=json.dumps(commands),
+            headers={"Content-type": "application/json"},
+            params={"commit": "true"},
+        )
+        if not ret.ok or ret.json().get("errors"):
+            logger.error("schema changes failed: %s", ret.text)
+        ret.raise_for_status()
+
+
+class SchemaValidationReport:
+    """
+    Differences found between the schema plan of some entities and the solr schema, see SolrSchemaPlan.validate
+    """
+
+    def __init__(self) -> None:
+        self.missing_fields = []
+        # (field name, expected type, actual type)
+        self.type_mismatches = []
+        # (field name, flag, expected value, actual value)
+        self.flag_mismatches = []
+        # (source, dest)
+        self.missing_copy_fields = []
+        self.missing_field_types = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.lines()
+
+    def lines(self) -> List[str]:
+        """
+        Human readable version of the report, one line per problem
+        @return: list of lines
+        """
+        lines = [f"missing field type {name}" for name in self.missing_field_types]
+        lines += [f"missing field {name}" for name in self.missing_fields]
+        lines += [
+            f"field {name} has type {actual} instead of {expected}"
+            for name, expected, actual in self.type_mismatches
+        ]
+        lines += [
+            f"field {name} has {flag}={actual} instead of {expected}"
+            for name, flag, expected, actual in self.flag_mismatches
+        ]
+        lines += [
+            f"missing copy field {source} -> {dest}"
+            for source, dest in self.missing_copy_fields
+        ]
+        return lines
+
+
+class SolrSchemaPlan:
+    """
+    In memory description of the fields, field types and copy fields solr should contain
+    Compared to a snapshot of the schema to compute the commands to send, see diff and removal
+    """
+
+    def __init__(self) -> None:
+        self.field_types = {}
+        self.fields = {}
+        self.copy_fields = []
+
+    def add_field_type(self, definition: dict) -> None:
+        self.field_types[definition["name"]] = definition
+
+    def add_field(
+        self,
+        name: str,
+        field_type: str,
+        indexed: bool = True,
+        stored: bool = True,
+        multivalued: bool = False,
+    ) -> None:
+        self.fields[name] = {
+            "name": name,
+            "type": field_type,
+            "indexed": indexed,
+            "stored": stored,
+            "multiValued": multivalued,
+        }
+
+    def add_copy_field(self, source: str, dest: str) -> None:
+        if (source, dest) not in self.copy_fields:
+            self.copy_fields.append((source, dest))
+
+    @staticmethod
+    def _differs(current: dict, definition: dict) -> bool:
+        return any(
+            current.get(key, FIELD_DEFAULTS.get(key)) != value
+            for key, value in definition.items()
+        )
+
+    def validate(self, schema: dict) -> "SchemaValidationReport":
+        """
+        Check locally that a schema contains the fields, field types and copy fields of the plan
+        @param schema: the current schema, see SolrSchemaAdmin.get_schema
+        @return: the list of problems found
+        """
+        report = SchemaValidationReport()
+        current_fields = {field["name"]: field for field in schema.get("fields", [])}
+        current_types = {
+            field_type["name"] for field_type in schema.get("fieldTypes", [])
+        }
+        current_copy_fields = {
+            (copy_field["source"], copy_field["dest"])
+            for copy_field in schema.get("copyFields", [])
+        }
+        for name in self.field_types:
+            if name not in current_types:
+                report.missing_field_types.append(name)
+        for name, definition in self.fields.items():
+            current = current_fields.get(name)
+            if current is None:
+                report.missing_fields.append(name)
+                continue
+            if current.get("type") != definition["type"]:
+                report.type_mismatches.append(
+                    (name, definition["type"], current.get("type"))
+                )
+            for flag, default in FIELD_DEFAULTS.items():
+                actual = current.get(flag, default)
+                if actual != definition[flag]:
+                    report.flag_mismatches.append(
+                        (name, flag, definition[flag], actual)
+                    )
+        for copy_field in self.copy_fields:
+            if copy_field not in current_copy_fields:
+                report.missing_copy_fields.append(copy_field)
+        return report
+
+    def diff(self, schema: dict) -> Dict[str, List[dict]]:
+        """
+        Commands to send so that the schema matches the plan, fields not part of the plan are kept
+        @param schema: the current schema, see SolrSchemaAdmin.get_schema
+        @return: dict of commands name and definitions in the order they should be applied
+        """
+        current_fields = {field["name"]: field for field in schema.get("fields", [])}
+        current_types = {
+            field_type["name"] for field_type in schema.get("fieldTypes", [])
+        }
+        current_copy_fields = {
+            (copy_field["source"], copy_field["dest"])
+            for copy_field in schema.get("copyFields", [])
+        }
+        copy_fields_dests = {dest for _, dest in self.copy_fields}
+        # solr applies the commands in this order
+        commands = {
+            "delete-copy-field": [],
+            "add-field-type": [],
+            "add-field": [],
+            "replace-field": [],
+            "add-copy-field": [],
+        }
+        for source, dest in sorted(current_copy_fields - set(self.copy_fields)):
+            if dest in copy_fields_dests:
+                commands["delete-copy-field"].append({"source": source, "dest": dest})
+        for name, definition in self.field_types.items():
+            if name not in current_types:
+                commands["add-field-type"].append(definition)
+        for name, definition in self.fields.items():
+            current = current_fields.get(name)
+            if current is None:
+                commands["add-field"].append(definition)
+            elif self._differs(current, definition):
+                commands["replace-field"].append(definition)
+        for source, dest in self.copy_fields:
+            if (source, dest) in current_copy_fields:
+                continue
+            if source not in self.fields and source not in current_fields:
+                # the whole request would be rejected
+                logger.warning("unknown field %s, copy to %s skipped", source, dest)
+                continue
+            commands["add-copy-field"].append({"source": source, "dest": dest})
+        return {name: items for name, items in commands.items() if items}
+
+    def removal(self, schema: dict) -> Dict[str, List[dict]]:
+        """
+        Commands to send to remove the fields of the plan and the copy fields using them
+        @param schema: the current schema, see SolrSchemaAdmin.get_schema
+        @return: dict of commands name and definitions in the order they should be applied
+        """
+        current_fields = {field["name"] for field in schema.get("fields", [])}
+        commands = {}
+        for copy_field in schema.get("copyFields", []):
+            if copy_field["source"] in self.fields or copy_field["dest"] in self.fields:
+                commands.setdefault("delete-copy-field", []).append(
+                    {"source": copy_field["source"], "dest": copy_field["dest"]}
+                )
+        for name in self.fields:
+            if name in current_fields:
+                commands.setdefault("delete-field", []).append({"name": name})
+        return commands
+
+
+def format_schema_commands(commands: Dict[str, List[dict]]) -> List[str]:
+    """
+    Human readable version of schema commands, one line per change
+    @param commands: dict of commands name and definitions, see SolrSchemaPlan.diff
+    @return: list of lines
+    """
+    lines = []
+    for name, definitions in commands.items():
+        for definition in definitions:
+            if "source" in definition:
+                target = f"{definition['source']} -> {definition['dest']}"
+            else:
+                target = definition["name"]
+            details = {
+                key: value
+                for key, value in definition.items()
+                if key not in ["name", "source", "dest"]
+            }
+            lines.append(
+                f"{name} {target} {json.dumps(details) if details else ''}".rstrip()
+            )
+    return lines
@@ -0,0 +1,282 @@
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+    datacatalog.solr.solr_orm_writer
+    -------------------
+
+   Module containing the SolrIndexWriter class used to index documents in bulk
+
+"""
+import json
+import logging
+import time
+from typing import Dict, Optional, Set
+
+from .. import app
+from ..metrics import track
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_BATCH_SIZE = 1000
+DEFAULT_INDEX_MAX_BYTES = 5 * 1024 * 1024
+
+
+def to_solr_value(value):
+    """
+    Convert the values json cannot encode, following the conventions of pysolr
+    @param value: a date or datetime instance
+    @return: the value in solr format
+    """
+    if hasattr(value, "strftime"):
+        if hasattr(value, "hour"):
+            offset = value.utcoffset()
+            if offset:
+                value = value - offset
+            return value.replace(tzinfo=None).isoformat() + "Z"
+        return "%sT00:00:00Z" % value.isoformat()
+    raise TypeError(f"Object of type {value.__class__.__name__} is not serializable")
+
+
+class SolrIndexWriter(object):
+    """
+    Buffered writer sending documents to solr in batches.
+    Documents are encoded once when added and a batch is sent as soon as it reaches the batch size or the byte budget.
+    Links to parent entities (see SolrEntity.reversed_field) are collected in memory and written when the writer is
+    closed, with one atomic update per parent.
+    Use it as a context manager so that the remaining documents are flushed and committed on exit:
+
+        with SolrIndexWriter(solr_orm) as writer:
+            for entity in entities:
+                entity.save(writer=writer)
+    """
+
+    def __init__(
+        self,
+        solr_orm,
+        batch_size: int = None,
+        max_bytes: int = None,
+        commit_within: Optional[int] = None,
+        commit: bool = True,
+        soft_commit: bool = False,
+    ) -> None:
+        """
+        Initialize a SolrIndexWriter instance
+        @param solr_orm: SolrORM instance holding the solr connection
+        @param batch_size: maximum number of documents per update request, default to SOLR_INDEX_BATCH_SIZE
+        @param max_bytes: maximum size of the body of an update request, default to SOLR_INDEX_MAX_BYTES
+        @param commit_within: if set, solr will commit the documents within this number of milliseconds,
+         default to SOLR_INDEX_COMMIT_WITHIN
+        @param commit: trigger a commit when the writer is closed
+        @param soft_commit: if true, the commit triggered on close will be a soft commit
+        """
+        self.solr_orm = solr_orm
+        self.batch_size = batch_size or app.config.get(
+            "SOLR_INDEX_BATCH_SIZE", DEFAULT_INDEX_BATCH_SIZE
+        )
+        self.max_bytes = max_bytes or app.config.get(
+            "SOLR_INDEX_MAX_BYTES", DEFAULT_INDEX_MAX_BYTES
+        )
+        if commit_within is None:
+            commit_within = app.config.get("SOLR_INDEX_COMMIT_WITHIN")
+        self.commit_within = commit_within
+        self.commit = commit
+        self.soft_commit = soft_commit
+        self._buffer = []
+        self._buffer_bytes = 0
+        # {(entity name, entity id): {solr field name: {linked id: None}}}
+        self._links = {}
+        # ids of the documents sent by this writer, with prefix
+        self._added_ids = set()
+        self.count = 0
+        self.requests_count = 0
+        self.start_time = None
+
+    def __enter__(self) -> "SolrIndexWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # still send what has been added so far, but don't commit a partial import
+            self.flush()
+
+    @staticmethod
+    def encode(entity_dict: dict) -> bytes:
+        """
+        Encode a document, null values and empty strings are skipped as pysolr does
+        @param entity_dict: a representation of a SolrEntity as a dict
+        @return: json encoded document
+        """
+        doc = {}
+        for key, value in entity_dict.items():
+            if isinstance(value, (list, tuple, set)):
+                value = [v for v in value if v is not None and v != ""]
+                if not value:
+                    continue
+            elif value is None or value == "":
+                continue
+            doc[key] = value
+        return json.dumps(doc, default=to_solr_value).encode("utf-8")
+
+    def add(self, entity_dict: dict) -> None:
+        """
+        Add a document to the buffer, sending the buffer to solr if one of the limits is reached
+        @param entity_dict: a representation of a SolrEntity as a dict, see SolrEntity.to_solr_document
+        """
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+        self._added_ids.add(entity_dict["id"])
+        encoded = self.encode(entity_dict)
+        # +1 for the separator
+        if self._buffer and self._buffer_bytes + len(encoded) + 1 > self.max_bytes:
+            self.flush()
+        self._buffer.append(encoded)
+        self._buffer_bytes += len(encoded) + 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Send the buffered documents to solr in a single update request
+        """
+        if not self._buffer:
+            return
+        body = b"[" + b",".join(self._buffer) + b"]"
+        path = "update/?wt=json"
+        if self.commit_within:
+            path += f"&commitWithin={self.commit_within}"
+        with track("solr", "update"):
+            self.solr_orm.indexer._send_request(
+                "post", path, body, {"Content-type": "application/json"}
+            )
+        self.count += len(self._buffer)
+        self.requests_count += 1
+        logger.debug(
+            "%s documents sent to solr (%s bytes)", len(self._buffer), len(body)
+        )
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    def add_link(
+        self, entity_name: str, entity_id: str, field_name: str, linked_id: str
+    ) -> None:
+        """
+        Record that linked_id should be added to a multivalued field of an entity
+        @param entity_name: type of the entity holding the field, e.g. project
+        @param entity_id: id of the entity holding the field, without prefix
+        @param field_name: name of the field, without prefix
+        @param linked_id: id to add to the field values
+        """
+        fields = self._links.setdefault((entity_name, entity_id), {})
+        # dict used as an ordered set
+        fields.setdefault(field_name, {})[linked_id] = None
+
+    def resolve_links(self) -> None:
+        """
+        Send one atomic update per entity for the links recorded with add_link
+        Entities that are neither in the index nor added by this writer are skipped
+        """
+        if not self._links:
+            return
+        self.flush()
+        links_by_type = {}
+        for (entity_name, entity_id), fields in self._links.items():
+            links_by_type.setdefault(entity_name, {})[entity_id] = fields
+        for entity_name, entities in links_by_type.items():
+            existing_ids = self._get_existing_ids(entity_name, list(entities))
+            for entity_id, fields in entities.items():
+                if entity_id not in existing_ids:
+                    logger.warning(
+                        "%s %s not found, links to its %s are ignored",
+                        entity_name,
+                        entity_id,
+                        ", ".join(fields),
+                    )
+                    continue
+                update = self.solr_orm.build_update(
+                    f"{entity_name}_{entity_id}",
+                    {
+                        f"{entity_name}_{field_name}": list(linked_ids)
+                        for field_name, linked_ids in fields.items()
+                    },
+                    op="add-distinct",
+                )
+                self.add(update)
+        logger.info("links updated for %s entities", len(self._links))
+        self._links = {}
+        self.flush()
+
+    def _get_existing_ids(self, entity_name: str, entity_ids: list) -> set:
+        prefix = entity_name + "_"
+        existing_ids = {
+            entity_id
+            for entity_id in entity_ids
+            if prefix + entity_id in self._added_ids
+        }
+        to_check = [
+            entity_id for entity_id in entity_ids if entity_id not in existing_ids
+        ]
+        entity_class = app.config["entities"].get(entity_name)
+        if entity_class is None:
+            return existing_ids
+        for start in range(0, len(to_check), self.batch_size):
+            docs = entity_class.query._get_docs(
+                to_check[start : start + self.batch_size], fl="id"
+            )
+            existing_ids.update(doc["id"][len(prefix) :] for doc in docs)
+        return existing_ids
+
+    @property
+    def modified_ids(self) -> Dict[str, Set[str]]:
+        """
+        Ids of the entities added or updated by this writer, including the entities updated by resolve_links
+        @return: dict of entity names and sets of ids without prefix
+        """
+        modified_ids = {}
+        for entity_name in app.config["entities"]:
+            prefix = entity_name + "_"
+            ids = {
+                solr_id[len(prefix) :]
+                for solr_id in self._added_ids
+                if solr_id.startswith(prefix)
+            }
+            if ids:
+                modified_ids[entity_name] = ids
+        return modified_ids
+
+    @property
+    def docs_per_second(self) -> float:
+        if self.start_time is None:
+            return 0.0
+        elapsed = time.perf_counter() - self.start_time
+        return self.count / elapsed if elapsed else 0.0
+
+    def close(self) -> None:
+        """
+        Flush the remaining documents, write the links and trigger the commit if requested
+        """
+        self.flush()
+        self.resolve_links()
+        if self.commit:
+            self.solr_orm.commit(soft_commit=self.soft_commit)
+        logger.info(
+            "%s documents indexed in %s requests (%.1f docs/s)",
+            self.count,
+            self.requests_count,
+            self.docs_per_second,
+        )
@@ -0,0 +1,204 @@
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+    datacatalog.solr.solr_query_cache
+    -------------------
+
+   Module containing the IndexGeneration and QueryCache classes used to cache the solr responses
+   until the index is modified or for at most SOLR_CACHE_MAX_AGE seconds
+
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_CACHE_SIZE = 1000
+DEFAULT_CACHE_MAX_AGE = 60
+
+
+class IndexGeneration(object):
+    """
+    Token identifying the state of the solr index, changed every time the application commits.
+    The token is written to a file so that all the processes sharing the file (web workers, manage.py commands)
+    see the commits of the others. Changes committed by other means (another host, solr autocommit, commitWithin)
+    are not seen, the generation also changes every max_age seconds to bound the staleness of the caches.
+    """
+
+    def __init__(self, path: Optional[str], max_age: Optional[float] = None) -> None:
+        """
+        Initialize an IndexGeneration instance
+        @param path: file holding the token, if None the token is only shared by the threads of the process
+        @param max_age: number of seconds after which the generation changes even without commit,
+         None or 0 to only change it on commits
+        """
+        self.path = path
+        self.max_age = max_age
+        # incremented by bump, so that the commits of this process are seen even if the file can't be written
+        self._local = 0
+        self._lock = threading.Lock()
+        self._file_stat = None
+        self._file_token = ""
+
+    @classmethod
+    def from_config(cls, config: dict, collection: str) -> "IndexGeneration":
+        """
+        Create an IndexGeneration using the SOLR_GENERATION_FILE and SOLR_CACHE_MAX_AGE settings,
+        the file defaults to a file of the temporary directory named after the solr collection
+        @param config: the application configuration
+        @param collection: solr core
+        @return: a new IndexGeneration instance
+        """
+        path = config.get("SOLR_GENERATION_FILE")
+        if path is None:
+            path = os.path.join(
+                tempfile.gettempdir(), f"datacatalog-{collection}.generation"
+            )
+            logger.warning(
+                "SOLR_GENERATION_FILE is not set, using %s, "
+                "commits of processes not sharing this file are only seen after SOLR_CACHE_MAX_AGE seconds",
+                path,
+            )
+        return cls(path, config.get("SOLR_CACHE_MAX_AGE", DEFAULT_CACHE_MAX_AGE))
+
+    def _read_file_token(self) -> str:
+        if not self.path:
+            return ""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return ""
+        # the file is replaced on every bump, a new inode or mtime means a new token
+        file_stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_stat != self._file_stat:
+            try:
+                with open(self.path) as generation_file:
+                    self._file_token = generation_file.read().strip()
+            except OSError:
+                return ""
+            self._file_stat = file_stat
+        return self._file_token
+
+    def current(self) -> tuple:
+        """
+        Current generation of the index, to be used as part of the cache keys
+        @return: a hashable value, different after each commit and at least every max_age seconds
+        """
+        # wall clock time so that all the processes expire their caches together
+        period = int(time.time() // self.max_age) if self.max_age else 0
+        with self._lock:
+            return self._local, self._read_file_token(), period
+
+    def bump(self) -> None:
+        """
+        Change the generation, to be called after every commit
+        """
+        with self._lock:
+            self._local += 1
+            if not self.path:
+                return
+            token = f"{time.time_ns()}-{os.getpid()}-{self._local}"
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w") as generation_file:
+                    generation_file.write(token)
+                # atomic, readers never see a partial token
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning("unable to write the index generation file: %s", e)
+
+
+class QueryCache(object):
+    """
+    Thread safe LRU cache of solr responses.
+    The entries are stored with the generation of the index they were computed for, all of them are dropped
+    as soon as a different generation is requested.
+    The cached values are shared, callers must not modify them.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_QUERY_CACHE_SIZE) -> None:
+        """
+        Initialize a QueryCache instance
+        @param max_size: maximum number of entries, the least recently used ones are evicted first.
+         0 disables the cache
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_generation(self, generation: Hashable) -> bool:
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+            return False
+        return True
+
+    def get(self, generation: Hashable, key: Hashable) -> Optional[Any]:
+        """
+        Retrieve a cached value
+        @param generation: current generation of the index, see IndexGeneration.current
+        @param key: normalized parameters of the request
+        @return: the cached value or None
+        """
+        with self._lock:
+            if self._check_generation(generation) and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, generation: Hashable, key: Hashable, value: Any) -> None:
+        """
+        Store a value, ignored if the generation changed in the meantime
+        @param generation: generation of the index the value was computed for
+        @param key: normalized parameters of the request
+        @param value: the value to cache
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Statistics of the cache
+        @return: dict with the number of entries, hits and misses
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
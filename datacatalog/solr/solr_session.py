@@ -0,0 +1,113 @@
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+    datacatalog.solr.solr_session
+    -------------------
+
+   Module containing the SolrSession class, the HTTP connection pool shared by all the requests sent to solr
+
+"""
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class SolrSession(requests.Session):
+    """
+    requests Session keeping the connections to solr alive in a pool shared by the threads of the process.
+    A default (connect, read) timeout is applied to every request and idempotent requests (GET, HEAD, ...)
+    are retried with an exponential backoff on connection errors and 502, 503, 504 responses.
+    """
+
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        connect_timeout: float = 5,
+        read_timeout: float = 60,
+        retries: int = 3,
+        backoff_factor: float = 0.3,
+    ) -> None:
+        """
+        Initialize a SolrSession instance
+        @param pool_size: maximum number of connections kept alive per solr host
+        @param connect_timeout: timeout in seconds to establish a connection
+        @param read_timeout: timeout in seconds waiting for the solr response
+        @param retries: maximum number of retries of idempotent requests
+        @param backoff_factor: delay factor between retries, see urllib3.Retry
+        """
+        super().__init__()
+        self.timeout = (connect_timeout, read_timeout)
+        # POST requests are not retried, see Retry.DEFAULT_ALLOWED_METHODS
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "SolrSession":
+        """
+        Create a SolrSession configured by the SOLR_POOL_SIZE, SOLR_CONNECT_TIMEOUT, SOLR_READ_TIMEOUT,
+        SOLR_RETRIES and SOLR_RETRY_BACKOFF settings
+        @param config: the application configuration
+        @return: a new SolrSession instance
+        """
+        return cls(
+            pool_size=config.get("SOLR_POOL_SIZE", 10),
+            connect_timeout=config.get("SOLR_CONNECT_TIMEOUT", 5),
+            read_timeout=config.get("SOLR_READ_TIMEOUT", 60),
+            retries=config.get("SOLR_RETRIES", 3),
+            backoff_factor=config.get("SOLR_RETRY_BACKOFF", 0.3),
+        )
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().request(method, url, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        Statistics of the connection pools
+        @return: dict with the number of pools, of connections opened since the start, of idle connections
+         and of requests sent
+        """
+        stats = {"pools": 0, "connections": 0, "idle_connections": 0, "requests": 0}
+        for adapter in set(self.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats["pools"] += 1
+                stats["connections"] += pool.num_connections
+                stats["requests"] += pool.num_requests
+                if pool.pool is not None:
+                    # the queue holds None for the connections not opened yet
+                    stats["idle_connections"] += sum(
+                        1 for connection in list(pool.pool.queue) if connection
+                    )
+        return stats
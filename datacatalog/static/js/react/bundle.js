@@ -1147,9 +1147,7 @@ var Autocomplete = /*#__PURE__*/function (_Component) {
       var _this$state = _this.state,
           suggestions = _this$state.suggestions,
           totalTermsState = _this$state.totalTermsState;
-      var _this$props = _this.props,
-          termsSearchLink = _this$props.termsSearchLink,
-          entityName = _this$props.entityName;
+      var termsSearchLink = _this.props.termsSearchLink;
       var suggestionsList = suggestions.filter(function (x) {
         return x.title !== null;
       });
@@ -1164,11 +1162,9 @@ var Autocomplete = /*#__PURE__*/function (_Component) {
         fetch(currLink).then(function (res) {
           return res.json();
         }).then(function (json) {
-          var suggestionsList = [];
+          var suggestionsList = json.data;
 
-          if (json.data.raw_response.suggest["suggest_" + entityName][input.toLowerCase().trim()].numFound > 0) {
-            suggestionsList = json.data.raw_response.suggest["suggest_" + entityName][input.toLowerCase().trim()].suggestions;
-          } else {
+          if (suggestionsList.length === 0) {
             console.log("no suggested terms found");
           }
 
@@ -1178,7 +1174,7 @@ var Autocomplete = /*#__PURE__*/function (_Component) {
           });
 
           for (var suggestedTermIndex in suggestionsList) {
-            var term = suggestionsList[suggestedTermIndex].term;
+            var term = suggestionsList[suggestedTermIndex];
 
             if (suggestionLowerCase.length < 0 || !suggestionLowerCase.includes(term.toLowerCase())) {
               terms.push(term);
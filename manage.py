@@ -26,6 +26,7 @@
       - clear_index: delete entities from index
       - commit changes: triggers a solr commit
       - import_entities: import entities into solr
+      - build_suggesters: build the autocomplete suggesters
 
 """
 import sys
@@ -37,10 +38,13 @@ from flask_script import Manager, Shell
 import requests
 
 from datacatalog import app
+from datacatalog.cache_tags import invalidate_entities
 from datacatalog.connector.extend_entity_index import EntitiesIndexExtender
 from datacatalog.exporter.entities_exporter import EntitiesExporter
+from datacatalog.exporter.titles_exporter import get_titles_exporter
 from datacatalog.importer.entities_importer import EntitiesImporter
 from datacatalog.controllers.sitemap_generator import generate_sitemap
+from datacatalog.solr.solr_orm_schema import format_schema_commands
 
 manager = Manager(app)
 
@@ -58,50 +62,78 @@ def test():
         sys.exit(1)
 
 
-@manager.command
-def init_index():
+@manager.option(
+    "--dry-run",
+    dest="dry_run",
+    action="store_true",
+    help="print the schema changes without applying them",
+)
+def init_index(dry_run=False):
     """
     Initialize the solr schema by creating the fields defined by the different SolrEntity subclasses
-    The fields should not exist before executing this operation.
-
-    Drop any existing field in the schema before running anything else in the init index
-        purpose: update index in case of error from check_schema
+    The current schema is compared to the fields defined by the entities, existing fields with different
+    properties are replaced and all the changes are applied in a single request.
     """
     solr_orm = app.config["_solr_orm"]
     try:
-        if solr_orm.check_fields_existence():
-            app.logger.info("Existing fields are being deleted")
-            solr_orm.delete_fields()
-        solr_orm.create_fields()
+        commands = solr_orm.create_fields(dry_run=dry_run)
+        if dry_run:
+            print_schema_commands(commands)
+            return
         solr_orm.solr_config_update()
     except requests.exceptions.HTTPError as e:
         app.logger.warning(e)
 
 
-@manager.command
-def update_index():
+@manager.option(
+    "--dry-run",
+    dest="dry_run",
+    action="store_true",
+    help="print the schema changes without applying them",
+)
+def update_index(dry_run=False):
     """
     Update the solr schema by updated the fields defined by the different SolrEntity subclasses
-    The fields should already exist before executing this operation.
+    Only the differences with the current schema are applied, in a single request.
     """
     solr_orm = app.config["_solr_orm"]
-    solr_orm.update_fields()
+    commands = solr_orm.update_fields(dry_run=dry_run)
+    if dry_run:
+        print_schema_commands(commands)
+
+
+def print_schema_commands(commands):
+    lines = format_schema_commands(commands)
+    if not lines:
+        print("solr schema is up to date")
+    for line in lines:
+        print(line)
 
 
 @manager.command
 def clear_index(entity_type):
     """
     Delete all instance of the specified entity type.
-    Doesn't trigger a commit but will clear the cache.
+    Doesn't trigger a commit but will invalidate the cached pages of the entity type
+    and the pages displaying the deleted entities.
     @param entity_type: name of the entity type, e.g. dataset
     """
     solr_orm = app.config["_solr_orm"]
     if entity_type == "all":
         query = "*:*"
+        entity_names = list(app.config["entities"])
     else:
         query = f"type:{entity_type}"
+        entity_names = [entity_type]
+    # the deleted entities may be displayed by the pages of the entities linked to them
+    deleted_ids = {
+        entity_name: app.config["entities"][entity_name].query.all_ids()
+        for entity_name in entity_names
+    }
     solr_orm.delete(query=query)
-    app.cache.clear()
+    for entity_name in entity_names:
+        invalidate_entities(entity_name)
+        invalidate_entities(entity_name, deleted_ids[entity_name])
 
 
 @manager.command
@@ -117,7 +149,9 @@ def commit_changes():
 def import_entities(connector_name, entity_name, sitemap=False):
     """
     Import entities of type entity_name using the connector specified by connector_name
-    Doesn't trigger a commit but will clear the cache.
+    Invalidates the cached pages of the entity type and the pages displaying the imported entities
+    or the entities linked to them.
+    Exports the titles of the entity type used by the search box.
     Checks if the schema exits and if it has been populated
     Checks for type mismatch for each field
     @param connector_name: Short name of the connector to use, e.g. Json. See method get_importer_connector
@@ -138,10 +172,15 @@ def import_entities(connector_name, entity_name, sitemap=False):
             app.logger.error("no known connector found")
             exit(1)
         importer = EntitiesImporter([connector])
-        importer.import_all()
+        modified_ids = importer.import_all()
+        solr_orm.build_suggesters([entity_name])
+        get_titles_exporter().export(entity_name)
         if sitemap:
             generate_sitemaps()
-        app.cache.clear()
+        invalidate_entities(entity_name)
+        # the pages of the other types display the modified entities, see cache_tags.add_page_tags
+        for modified_entity_name, entity_ids in modified_ids.items():
+            invalidate_entities(modified_entity_name, entity_ids)
     else:
         app.logger.error("Please run init_index first! ")
         exit(1)
@@ -158,6 +197,25 @@ def extend_entity_index(entity_name):
         EntitiesIndexExtender.extend_study_index()
     if entity_name.lower() == "dataset":
         EntitiesIndexExtender.extend_dataset_index()
+    app.config["_solr_orm"].build_suggesters([entity_name.lower()])
+    get_titles_exporter().export(entity_name.lower())
+    invalidate_entities(entity_name.lower())
+
+
+@manager.command
+def build_suggesters(entity_name="all"):
+    """
+    Build the autocomplete suggesters from the indexed entities.
+    Done by import_entities and extend_entity_index, only needed after other changes of the index.
+    @param entity_name: name of the entity type, e.g. dataset, default to all the types
+    """
+    if entity_name == "all":
+        app.config["_solr_orm"].build_suggesters()
+    elif entity_name in app.config["entities"]:
+        app.config["_solr_orm"].build_suggesters([entity_name])
+    else:
+        app.logger.error("unknown entity name")
+        exit(1)
 
 
 @manager.command
@@ -186,7 +244,7 @@ def export_entities(connector_name, entity_name):
     if not connector:
         app.logger.error("no known connector found")
         exit(1)
-    entities = entity_class.query.all()
+    entities = entity_class.query.iter_all()
     exporter = EntitiesExporter([connector])
     exporter.export_all(entities)
 
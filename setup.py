@@ -48,6 +48,7 @@ requirements = [
     "jsonpath-ng==1.5.3",
     "python-slugify==5.0.2",
     "jsonschema==4.4.0",
+    "prometheus-client==0.14.1",
 ]
 
 test_requirements = ["coverage==5.5"]
@@ -27,6 +27,7 @@ from remsclient import (
     FormTemplateFieldsOptions,
     OrganizationOverview,
 )
+from remsclient.rest import ApiException
 from werkzeug.datastructures import ImmutableMultiDict
 from wtforms import (
     StringField,
@@ -40,6 +41,11 @@ from wtforms.fields.html5 import EmailField
 
 from datacatalog import app
 from datacatalog.acces_handler.access_handler import ApplicationState
+from datacatalog.acces_handler.rems_cache import (
+    applications_states,
+    rems_metadata,
+    form_classes,
+)
 from datacatalog.acces_handler.rems_handler import RemsAccessHandler
 from datacatalog.models.dataset import Dataset
 from tests.base_test import BaseTest
@@ -58,6 +64,9 @@ class dotdict(dict):
 class TestRemsAccessHandler(BaseTest):
     def setUp(self):
         self.assertTrue(self.app.testing)
+        applications_states.clear()
+        rems_metadata.clear()
+        form_classes.clear()
         title = "Great dataset!"
         self.dataset = Dataset(title)
         self.dataset.e2e = True
@@ -86,8 +95,8 @@ class TestRemsAccessHandler(BaseTest):
         self.assertTrue(self.rems_access_handler.supports_listing_accesses())
 
     def test_has_access_application_none(self):
-        self.rems_access_handler.rems_connector.applications = MagicMock()
-        self.rems_access_handler.rems_connector.applications.return_value = []
+        self.rems_access_handler.rems_connector.my_applications = MagicMock()
+        self.rems_access_handler.rems_connector.my_applications.return_value = []
         result = self.rems_access_handler.has_access(self.dataset)
         self.assertFalse(result)
 
@@ -102,6 +111,7 @@ class TestRemsAccessHandler(BaseTest):
                     "userid": "test",
                 },
                 "applicationfirst_submitted": None,
+                "applicationresources": [dotdict({"resourceext_id": self.dataset_id})],
                 "applicationstate": "application.state/draft",
             }
         ]
@@ -111,8 +121,10 @@ class TestRemsAccessHandler(BaseTest):
             applications[0].applicationapplicant
         )
 
-        self.rems_access_handler.rems_connector.applications = MagicMock()
-        self.rems_access_handler.rems_connector.applications.return_value = applications
+        self.rems_access_handler.rems_connector.my_applications = MagicMock()
+        self.rems_access_handler.rems_connector.my_applications.return_value = (
+            applications
+        )
         result = self.rems_access_handler.has_access(self.dataset)
         self.assertFalse(result)
 
@@ -127,6 +139,7 @@ class TestRemsAccessHandler(BaseTest):
                     "userid": app.config.get("REMS_API_USER"),
                 },
                 "applicationfirst_submitted": None,
+                "applicationresources": [dotdict({"resourceext_id": self.dataset_id})],
                 "applicationstate": "application.state/approved",
             }
         ]
@@ -136,10 +149,78 @@ class TestRemsAccessHandler(BaseTest):
             applications[0].applicationapplicant
         )
 
-        self.rems_access_handler.rems_connector.applications = MagicMock()
-        self.rems_access_handler.rems_connector.applications.return_value = applications
+        self.rems_access_handler.rems_connector.my_applications = MagicMock()
+        self.rems_access_handler.rems_connector.my_applications.return_value = (
+            applications
+        )
         result = self.rems_access_handler.has_access(self.dataset)
         self.assertEqual(result.value, ApplicationState.approved.value)
+        # a single call to REMS, the states are cached
+        self.assertEqual(
+            ApplicationState.approved, self.rems_access_handler.has_access(self.dataset)
+        )
+        self.rems_access_handler.rems_connector.my_applications.assert_called_once()
+
+    def test_has_access_cached_per_host(self):
+        applications = [
+            dotdict(
+                {
+                    "applicationapplicant": {"userid": app.config.get("REMS_API_USER")},
+                    "applicationstate": "application.state/approved",
+                    "applicationresources": [
+                        dotdict({"resourceext_id": self.dataset_id})
+                    ],
+                }
+            )
+        ]
+        self.rems_access_handler.rems_connector.my_applications = MagicMock()
+        self.rems_access_handler.rems_connector.my_applications.return_value = (
+            applications
+        )
+        other_host_handler = RemsAccessHandler(
+            current_user,
+            app.config.get("REMS_API_USER"),
+            app.config.get("REMS_API_KEY"),
+            "https://other-rems.example.org",
+        )
+        other_host_handler.rems_connector.my_applications = MagicMock()
+        other_host_handler.rems_connector.my_applications.return_value = []
+        self.assertEqual(
+            ApplicationState.approved, self.rems_access_handler.has_access(self.dataset)
+        )
+        # same user, but the applications of the first host are not used for the other one
+        self.assertFalse(other_host_handler.has_access(self.dataset))
+        self.assertEqual(
+            ApplicationState.approved, self.rems_access_handler.has_access(self.dataset)
+        )
+        self.rems_access_handler.rems_connector.my_applications.assert_called_once()
+        other_host_handler.rems_connector.my_applications.assert_called_once()
+
+    def test_has_access_rems_error_not_cached(self):
+        self.rems_access_handler.rems_connector.my_applications = MagicMock()
+        self.rems_access_handler.rems_connector.my_applications.side_effect = (
+            ApiException(status=500)
+        )
+        self.assertFalse(self.rems_access_handler.has_access(self.dataset))
+        applications = [
+            dotdict(
+                {
+                    "applicationapplicant": {"userid": app.config.get("REMS_API_USER")},
+                    "applicationstate": "application.state/approved",
+                    "applicationresources": [
+                        dotdict({"resourceext_id": self.dataset_id})
+                    ],
+                }
+            )
+        ]
+        self.rems_access_handler.rems_connector.my_applications.side_effect = None
+        self.rems_access_handler.rems_connector.my_applications.return_value = (
+            applications
+        )
+        # REMS is called again, the error was not cached
+        self.assertEqual(
+            ApplicationState.approved, self.rems_access_handler.has_access(self.dataset)
+        )
 
     def test_has_access_application_draft(self):
         applications = [
@@ -152,6 +233,7 @@ class TestRemsAccessHandler(BaseTest):
                     "userid": app.config.get("REMS_API_USER"),
                 },
                 "applicationfirst_submitted": None,
+                "applicationresources": [dotdict({"resourceext_id": self.dataset_id})],
                 "applicationstate": "application.state/draft",
             }
         ]
@@ -161,8 +243,10 @@ class TestRemsAccessHandler(BaseTest):
             applications[0].applicationapplicant
         )
 
-        self.rems_access_handler.rems_connector.applications = MagicMock()
-        self.rems_access_handler.rems_connector.applications.return_value = applications
+        self.rems_access_handler.rems_connector.my_applications = MagicMock()
+        self.rems_access_handler.rems_connector.my_applications.return_value = (
+            applications
+        )
         result = self.rems_access_handler.has_access(self.dataset)
         self.assertFalse(result)
 
@@ -303,6 +387,11 @@ class TestRemsAccessHandler(BaseTest):
         self.assertIsInstance(result.option, SelectField)
         self.assertIsInstance(result.multiselect, SelectMultipleField)
         self.assertIsInstance(result.email, EmailField)
+        # the form class is built once, only the data are bound per request
+        other_result = self.rems_access_handler.create_form(self.dataset, form_data)
+        self.assertIs(type(result), type(other_result))
+        get_form = self.rems_access_handler.rems_connector.get_form_for_catalogue_item
+        get_form.assert_called_once()
 
         def test_build_application(self):
             application = {
@@ -16,9 +16,11 @@
 #  You should have received a copy of the GNU Affero General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import gzip
 import json
 import os
 import random
+import tempfile
 from unittest.mock import patch
 
 from flask import url_for
@@ -27,11 +29,14 @@ from datacatalog import app
 from datacatalog.connector.dats_connector import DATSConnector
 from datacatalog.connector.geostudies_connector import GEOStudiesConnector
 from datacatalog.connector.json_connector import JSONConnector
+from datacatalog.exporter.titles_exporter import TitlesExporter
 from datacatalog.controllers.api_entities import (
     api_entity,
     api_entities,
     api_search_autocomplete_entities,
     api_entity_attachments,
+    api_global_search,
+    api_entities_titles,
 )
 from datacatalog.importer.entities_importer import EntitiesImporter
 from datacatalog.models.dataset import Dataset
@@ -89,6 +94,52 @@ class TestApiEntities(BaseTest):
         self.assert200(api_entities("study"))
         self.assert200(api_entities("project"))
 
+    def test_api_global_search(self):
+        with app.test_request_context("/api/search?rows=2"):
+            response = api_global_search()
+        self.assert200(response)
+        data = response.json["data"]
+        self.assertEqual(
+            {"dataset", "study", "project"},
+            {name for name in data if data[name]["hits"]},
+        )
+        self.assertEqual(Dataset.query.count(), data["dataset"]["hits"])
+        self.assertEqual(2, len(data["dataset"]["entities"]))
+        # one request for all the types
+        found = self.solr_orm.global_search("", rows_per_type=1, entity_names=["study"])
+        self.assertEqual(["study"], list(found))
+        self.assertIsInstance(found["study"]["entities"][0], Study)
+
+    def test_api_entities_titles(self):
+        with tempfile.TemporaryDirectory() as folder:
+            exporter = TitlesExporter(folder)
+            with patch(
+                "datacatalog.controllers.api_entities.get_titles_exporter",
+                return_value=exporter,
+            ):
+                with app.test_request_context(
+                    "/api/datasets/titles", headers={"Accept-Encoding": "gzip"}
+                ):
+                    response = api_entities_titles("dataset")
+                self.assert200(response)
+                self.assertEqual("gzip", response.headers["Content-Encoding"])
+                self.assertIn("max-age", response.headers["Cache-Control"])
+                titles = json.loads(gzip.decompress(response.get_data()))["data"]
+                self.assertEqual(Dataset.query.count(), len(titles))
+                self.assertEqual({"id", "title", "slug"}, set(titles[0]))
+                etag = response.get_etag()[0]
+                self.assertEqual(exporter.export("dataset").etag, etag)
+                # not compressed for the clients not supporting it
+                with app.test_request_context("/api/datasets/titles"):
+                    response = api_entities_titles("dataset")
+                self.assertNotIn("Content-Encoding", response.headers)
+                self.assertEqual(titles, response.json["data"])
+                with app.test_request_context(
+                    "/api/datasets/titles", headers={"If-None-Match": f'"{etag}"'}
+                ):
+                    self.assertEqual(304, api_entities_titles("dataset").status_code)
+                self.assert404(api_entities_titles("unknown"))
+
     @patch("datacatalog.solr.solr_orm_entity.SolrEntity.list_attached_files")
     def test_api_entity_attachment(self, mock_list):
         dataset = Dataset.query.all()
@@ -191,9 +242,16 @@ class TestApiEntities(BaseTest):
 
     def test_api_search_autocomplete_entities(self):
         app.config["_solr_orm"].solr_config_update()
+        app.config["_solr_orm"].build_suggesters()
         self.assertIsNotNone(api_search_autocomplete_entities("dataset", "a").data)
         self.assertIsNotNone(api_search_autocomplete_entities("study", "a").data)
         self.assertIsNotNone(api_search_autocomplete_entities("project", "a").data)
+        terms = api_search_autocomplete_entities("dataset", "A ").json["data"]
+        self.assertIsInstance(terms, list)
+        self.assertTrue(all(isinstance(term, str) for term in terms))
+        self.assertEqual(
+            [], api_search_autocomplete_entities("dataset", " ").json["data"]
+        )
 
     def tearDown(self):
         app.config["_solr_orm"].delete(query="*:*")
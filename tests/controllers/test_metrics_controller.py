@@ -0,0 +1,46 @@
+# coding=utf-8
+
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from datacatalog.metrics import track
+from datacatalog.models.dataset import Dataset
+from tests.base_test import BaseTest
+
+
+class TestMetricsController(BaseTest):
+    def test_metrics(self):
+        app = self.app
+        # not served by the query cache
+        app.config["_solr_orm"].commit()
+        Dataset.query.search("", rows=1)
+        with self.assertRaises(ValueError):
+            with track("ldap", "bind"):
+                raise ValueError()
+        response = self.client.get("/metrics")
+        self.assert200(response)
+        body = response.data.decode("utf-8")
+        self.assertIn(
+            'datacatalog_backend_request_duration_seconds_count{backend="solr",operation="search",entity="dataset"}',
+            body,
+        )
+        self.assertIn(
+            'datacatalog_backend_request_errors_total{backend="ldap",operation="bind",entity=""}',
+            body,
+        )
+        self.assertIn(
+            'datacatalog_solr_qtime_seconds_count{operation="search",entity="dataset"}',
+            body,
+        )
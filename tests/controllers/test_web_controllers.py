@@ -40,6 +40,7 @@ from datacatalog.controllers.web_controllers import (
     get_entity,
 )
 from datacatalog.exceptions import AuthenticationException
+from datacatalog.exporter.titles_exporter import get_titles_exporter
 from datacatalog.importer.entities_importer import EntitiesImporter
 from datacatalog.models.dataset import Dataset
 from datacatalog.models.project import Project
@@ -128,6 +129,34 @@ class TestWebControllers(BaseTest):
                 search_result_clean_text,
             )
 
+    def assert_search_single_request(self, entity_name):
+        # the titles of the search box are exported at import time
+        get_titles_exporter().export(entity_name)
+        indexer = app.config["_solr_orm"].indexer
+        with patch.object(indexer, "search", wraps=indexer.search) as search:
+            with self.client as client:
+                response = client.get(
+                    url_for("entities_search", entity_name=entity_name)
+                )
+        self.assertEqual(200, response.status_code)
+        # a second request would mean the template reads fields missing from SEARCH_FIELDS
+        self.assertEqual(1, search.call_count)
+        self.assertEqual("on", search.call_args[1]["facet"])
+
+    def test_search_single_request(self):
+        self.assert_search_single_request("dataset")
+
+    def test_search_single_request_studies(self):
+        self.assert_search_single_request("study")
+
+    def test_search_empty_index(self):
+        app.config["_solr_orm"].delete(query="*:*")
+        app.config["_solr_orm"].commit()
+        with self.client as client:
+            response = client.get("/datasets")
+        self.assertEqual(200, response.status_code)
+        self.assertIn("0 datasets found", get_clean_html_body(response))
+
     def test_search_query_sort_order(self):
         with self.client as client:
             search_result_desc = client.get("/search?query=med&sort_by=&order=desc")
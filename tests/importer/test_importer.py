@@ -66,6 +66,25 @@ class TestSolrORM(BaseTest):
         self.assertFalse(self.solr_orm.field_type_mismatch("project"))
         self.assertFalse(self.solr_orm.field_type_mismatch("dataset"))
 
+    def test_validate_schema(self):
+        self.assertTrue(self.solr_orm.validate_schema("dataset").ok)
+        self.solr_orm.indexer_schema.update_field(
+            "dataset_title", "text_en", True, False, True
+        )
+        try:
+            report = self.solr_orm.validate_schema("dataset")
+            self.assertFalse(report.ok)
+            self.assertEqual(
+                [("dataset_title", "string", "text_en")], report.type_mismatches
+            )
+            self.assertIn(
+                ("dataset_title", "multiValued", False, True), report.flag_mismatches
+            )
+            self.assertTrue(self.solr_orm.field_type_mismatch("dataset"))
+        finally:
+            self.solr_orm.update_fields()
+        self.assertFalse(self.solr_orm.field_type_mismatch("dataset"))
+
     def test_check_fields_existence(self):
         self.assertTrue(self.solr_orm.check_fields_existence())
 
@@ -16,11 +16,16 @@
 #  You should have received a copy of the GNU Affero General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import json
+from datetime import datetime
+
 from tests.base_test import BaseTest
 from datacatalog import app
+from datacatalog.exceptions import SolrVersionConflictException
 from datacatalog.models.dataset import Dataset
 from datacatalog.models.project import Project
 from datacatalog.models.study import Study
+from datacatalog.solr.solr_query_cache import IndexGeneration
 
 __author__ = "Valentin Grouès"
 
@@ -121,6 +126,205 @@ class TestModels(BaseTest):
         self.assertEqual(study1_title, studies_entities[0].title)
         self.assertEqual(study2_title, studies_entities[1].title)
 
+    def test_linked_entities_memoized(self):
+        study = Study("study1")
+        study.save()
+        project = Project("project1")
+        project.studies = [study.id]
+        project.save()
+        self.solr_orm.commit()
+        retrieved_project = Project.query.get(project.id)
+        studies_entities = retrieved_project.studies_entities
+        self.assertIs(studies_entities, retrieved_project.studies_entities)
+        self.assertNotIn("_relationships_cache", retrieved_project.to_api_dict())
+        retrieved_project.studies = []
+        self.assertEqual([], retrieved_project.studies_entities)
+        retrieved_study = Study.query.get(study.id)
+        self.assertEqual(project.id, retrieved_study.project_entity.id)
+        self.assertIs(retrieved_study.project_entity, retrieved_study.project_entity)
+
+    def test_prefetch(self):
+        dataset = Dataset("dataset1")
+        dataset.save()
+        study = Study("study1")
+        study.datasets = [dataset.id]
+        study.save()
+        project = Project("project1")
+        project.studies = [study.id]
+        project.save()
+        self.solr_orm.commit()
+        retrieved_project = Project.query.get(
+            project.id, prefetch=["studies", "studies.datasets"]
+        )
+        cache = retrieved_project.__dict__["_relationships_cache"]
+        self.assertIn("studies_entities", cache)
+        retrieved_study = retrieved_project.studies_entities[0]
+        self.assertIn(
+            "datasets_entities", retrieved_study.__dict__["_relationships_cache"]
+        )
+        self.assertEqual("dataset1", retrieved_study.datasets_entities[0].title)
+        retrieved_dataset = Dataset.query.get(dataset.id, prefetch=["study.project"])
+        self.assertEqual("study1", retrieved_dataset.study_entity.title)
+        self.assertEqual(
+            "project1", retrieved_dataset.study_entity.project_entity.title
+        )
+
+    def test_prefetch_ids_with_commas(self):
+        self.solr_orm.delete(query="*:*")
+        dataset = Dataset("dataset1", entity_id="a,b")
+        dataset.save()
+        other_dataset = Dataset("dataset2", entity_id="a")
+        other_dataset.save()
+        study = Study("study1")
+        study.datasets = [dataset.id]
+        study.save()
+        self.solr_orm.commit()
+        holding_entities = Study.query.search_holding_entities_many(
+            ["a,b"], "datasets", "study"
+        )
+        self.assertEqual(["study1"], [entity.title for entity in holding_entities])
+        self.assertEqual(
+            [],
+            Study.query.search_holding_entities_many(["a", "b"], "datasets", "study"),
+        )
+        retrieved = Dataset.query.get_many(["a,b", "a"])
+        Dataset.query.prefetch(retrieved, ["study"])
+        self.assertEqual("study1", retrieved[0].study_entity.title)
+        self.assertFalse(retrieved[1].study_entity)
+
+    def test_search_partial_fields(self):
+        self.solr_orm.delete(query="*:*")
+        for index in range(3):
+            dataset = Dataset(f"dataset {index}")
+            dataset.version = str(index)
+            dataset.save()
+        self.solr_orm.commit()
+        results = Dataset.query.search("", fields=["title"])
+        self.assertEqual(3, len(results.entities))
+        dataset = results.entities[0]
+        self.assertNotIn("version", dataset.__dict__)
+        self.assertEqual(dataset.title[-1], dataset.version)
+        # all the entities have been loaded by the first access
+        for dataset in results.entities:
+            self.assertIn("version", dataset.__dict__)
+            self.assertNotIn("_loader", dataset.__dict__)
+
+    def test_decoder(self):
+        doc = {
+            "id": "project_p1",
+            "type": "project",
+            "project_title": "project1",
+            "project_start_date": "2020-04-30T10:11:12Z",
+            "project_contacts": [
+                json.dumps(
+                    {
+                        "email": "john@doe.com",
+                        "first_name": "John",
+                        "last_name": "Doe",
+                        "full_name": "John Doe",
+                        "affiliation": "",
+                        "business_address": "",
+                        "roles": [],
+                    }
+                )
+            ],
+        }
+        project = Project.query.decoder.decode(doc)
+        self.assertEqual("p1", project.id)
+        self.assertEqual("project1", project.title)
+        self.assertEqual(datetime(2020, 4, 30, 10, 11, 12), project.start_date)
+        self.assertEqual("John Doe", project.contacts[0].full_name)
+        self.assertIsNone(project.website)
+        partial = Project.query.decoder.decode(doc, fields=["title"])
+        self.assertNotIn("start_date", partial.__dict__)
+
+    def test_save_only(self):
+        self.solr_orm.delete(query="*:*")
+        dataset = Dataset("dataset")
+        dataset.version = "1"
+        dataset.save(commit=True)
+        retrieved_dataset = Dataset.query.get(dataset.id)
+        retrieved_dataset.title = "not saved"
+        retrieved_dataset.version = "2"
+        retrieved_dataset.save(only=["version"], check_version=True, commit=True)
+        retrieved_dataset = Dataset.query.get(dataset.id)
+        self.assertEqual("dataset", retrieved_dataset.title)
+        self.assertEqual("2", retrieved_dataset.version)
+        self.solr_orm.update_entity_fields(
+            "dataset_" + dataset.id,
+            {"dataset_data_types": ["a", "b"]},
+            op="add",
+            commit=True,
+        )
+        self.assertEqual(["a", "b"], Dataset.query.get(dataset.id).data_types)
+
+    def test_save_only_version_conflict(self):
+        self.solr_orm.delete(query="*:*")
+        dataset = Dataset("dataset")
+        dataset.save(commit=True)
+        retrieved_dataset = Dataset.query.get(dataset.id)
+        dataset.version = "2"
+        dataset.save(commit=True)
+        retrieved_dataset.version = "3"
+        with self.assertRaises(SolrVersionConflictException):
+            retrieved_dataset.save(only=["version"], check_version=True)
+
+    def test_counts(self):
+        self.solr_orm.delete(query="*:*")
+        self.solr_orm.commit()
+        self.assertEqual({}, self.solr_orm.counts())
+        Dataset("dataset1").save()
+        Dataset("dataset2").save()
+        Study("study").save()
+        # committed behind the back of the ORM, solr counts the new documents
+        self.solr_orm.indexer.commit()
+        self.assertEqual(3, self.solr_orm.indexer.search("*:*", rows=0).hits)
+        # but the counts are cached until the generation changes
+        self.assertEqual({}, self.solr_orm.counts())
+        # a commit by another process sharing the generation file
+        IndexGeneration(self.solr_orm.generation.path).bump()
+        self.assertEqual({"dataset": 2, "study": 1}, self.solr_orm.counts())
+
+    def test_get_many(self):
+        self.solr_orm.delete(query="*:*")
+        study1 = Study("study1")
+        study1.save()
+        study2 = Study("study2")
+        study2.save()
+        self.solr_orm.commit()
+        studies = Study.query.get_many([study2.id, "missing", study1.id])
+        self.assertEqual(["study2", "study1"], [study.title for study in studies])
+        self.assertEqual([], Study.query.get_many([]))
+
+    def test_get_many_ids_with_commas(self):
+        self.solr_orm.delete(query="*:*")
+        Study("study1", entity_id="a,b").save()
+        Study("study2", entity_id="a").save()
+        self.solr_orm.commit()
+        studies = Study.query.get_many(["a,b"])
+        self.assertEqual(["study1"], [study.title for study in studies])
+        studies = Study.query.get_many(["a", "a,b"])
+        self.assertEqual(["study2", "study1"], [study.title for study in studies])
+
+    def test_iter_all(self):
+        self.solr_orm.delete(query="*:*")
+        titles = {f"dataset {index}" for index in range(7)}
+        for title in titles:
+            Dataset(title).save()
+        self.solr_orm.commit()
+        datasets = list(Dataset.query.iter_all(batch_size=3))
+        self.assertEqual(titles, {dataset.title for dataset in datasets})
+        self.assertEqual(
+            {dataset.id for dataset in datasets}, set(Dataset.query.all_ids())
+        )
+        datasets = list(Dataset.query.iter_all(batch_size=2, fields=["title"]))
+        self.assertEqual(7, len(datasets))
+        self.assertEqual(titles, {dataset.title for dataset in datasets})
+        # the other fields are not retrieved but loaded on first access
+        self.assertNotIn("e2e", datasets[0].__dict__)
+        self.assertFalse(datasets[0].e2e)
+        self.assertIn("e2e", datasets[1].__dict__)
+
     def tearDown(self):
         app.config["_solr_orm"].delete(query="*:*")
         app.config["_solr_orm"].commit()
@@ -20,7 +20,7 @@ from tests.base_test import BaseTest
 
 from datacatalog import app
 from datacatalog.models.dataset import Dataset
-from datacatalog.solr.facets import Range, Facet, FacetRange
+from datacatalog.solr.facets import Range, Facet, FacetRange, FacetStats
 
 __author__ = "Nirmeen Sallam"
 
@@ -85,3 +85,77 @@ class Test(BaseTest):
             orm.delete(query="*:*")
             orm.delete_fields()
             orm.commit()
+
+    def test_json_facets_keys(self):
+        facets = [
+            Facet("fair_score_content_pre", "Content"),
+            FacetRange("fair_score_content_pre", "Content", Range(0, 60, 20)),
+            FacetStats("fair_score_content_pre", "Content"),
+        ]
+        json_facets = Dataset.query._get_json_facets(facets)
+        self.assertEqual(
+            [
+                "fair_score_content_pre",
+                "fair_score_content_pre__range",
+                "fair_score_content_pre__stats",
+            ],
+            sorted(json_facets),
+        )
+        parsed = Dataset.query._parse_json_facets(
+            {
+                "fair_score_content_pre": {"buckets": [{"val": 10.0, "count": 1}]},
+                "fair_score_content_pre__range": {
+                    "buckets": [{"val": 0, "count": 1}, {"val": 20, "count": 0}]
+                },
+                "fair_score_content_pre__stats": {"min": 10.0},
+            },
+            facets,
+        )
+        self.assertEqual([10.0, 1], parsed["facet_fields"]["fair_score_content_pre"])
+        self.assertEqual(
+            [0, 1, 20, 0], parsed["facet_ranges"]["fair_score_content_pre"]["counts"]
+        )
+        self.assertEqual(10.0, parsed["facet_stats"]["fair_score_content_pre"]["min"])
+
+    def test_json_facets(self):
+        orm = app.config["_solr_orm"]
+        orm.delete(query="*:*")
+        orm.delete_fields()
+        orm.create_fields()
+        orm.commit()
+        for title, score in [("first", 10.0), ("second", 35.0), ("third", 70.0)]:
+            Dataset(title=title, fair_score_content_pre=score).save()
+        orm.commit()
+        try:
+            for json_facets in [True, False]:
+                facets = [
+                    Facet("title", "Title"),
+                    FacetRange(
+                        "fair_score_content_pre", "Content", Range(0, 60, 20, "after")
+                    ),
+                    FacetStats("fair_score_content_pre", "Content", ["min", "avg"]),
+                ]
+                results = Dataset.query.search(
+                    query="", facets=facets, json_facets=json_facets
+                )
+                self.assertEqual(
+                    {"first": 1, "second": 1, "third": 1},
+                    dict(zip(*[iter(results.facets["facet_fields"]["title"])] * 2)),
+                )
+                facet_range = results.facets["facet_ranges"]["fair_score_content_pre"]
+                self.assertEqual([1, 1, 0], facet_range["counts"][1::2])
+                self.assertEqual(1, facet_range["after"])
+                stats = results.facets["facet_stats"]["fair_score_content_pre"]
+                self.assertEqual(10.0, stats["min"])
+                self.assertAlmostEqual(115.0 / 3, stats["avg"])
+
+            facets[1].set_values(["[20 TO 40}"])
+            results = Dataset.query.search(query="", facets=facets)
+            self.assertEqual(1, results.hits)
+            self.assertEqual(
+                35.0, results.facets["facet_stats"]["fair_score_content_pre"]["min"]
+            )
+        finally:
+            orm.delete(query="*:*")
+            orm.delete_fields()
+            orm.commit()
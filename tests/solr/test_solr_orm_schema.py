@@ -18,6 +18,7 @@
 import requests
 
 from datacatalog import app
+from datacatalog.solr.solr_orm_schema import SolrSchemaPlan, format_schema_commands
 from tests.base_test import BaseTest
 
 __author__ = "Nirmeen Sallam"
@@ -93,6 +94,60 @@ class TestModels(BaseTest):
         self.assertNotIn("dataset_test", class_attributes)
         self.solr_orm.commit()
 
+    def test_sync_schema(self):
+        commands = self.solr_orm.create_fields(dry_run=True)
+        self.assertIn("add-field", commands)
+        self.assertNotIn(
+            "dataset_title",
+            requests.get(self.solr_orm.indexer_schema.url + "/fields").text,
+        )
+        self.solr_orm.create_fields()
+        # nothing left to change
+        self.assertEqual({}, self.solr_orm.update_fields(dry_run=True))
+        removal = self.solr_orm.delete_fields()
+        self.assertIn("delete-field", removal)
+        self.assertEqual({}, self.solr_orm.delete_fields(dry_run=True))
+
+    def test_schema_plan_diff(self):
+        plan = SolrSchemaPlan()
+        plan.add_field("dataset_title", "string")
+        plan.add_field("dataset_size", "pint")
+        plan.add_field("dataset_text_", "text_en", stored=False, multivalued=True)
+        plan.add_copy_field("dataset_title", "dataset_text_")
+        plan.add_copy_field("dataset_unknown", "dataset_text_")
+        schema = {
+            "fields": [
+                {"name": "dataset_title", "type": "string"},
+                {"name": "dataset_size", "type": "string"},
+                {"name": "other", "type": "string"},
+            ],
+            "copyFields": [{"source": "dataset_size", "dest": "dataset_text_"}],
+            "fieldTypes": [],
+        }
+        commands = plan.diff(schema)
+        self.assertEqual(
+            [
+                "delete-copy-field",
+                "add-field",
+                "replace-field",
+                "add-copy-field",
+            ],
+            list(commands),
+        )
+        self.assertEqual(["dataset_text_"], [f["name"] for f in commands["add-field"]])
+        self.assertEqual(
+            ["dataset_size"], [f["name"] for f in commands["replace-field"]]
+        )
+        self.assertEqual(
+            [{"source": "dataset_title", "dest": "dataset_text_"}],
+            commands["add-copy-field"],
+        )
+        self.assertEqual(
+            ["dataset_title", "dataset_size"],
+            [f["name"] for f in plan.removal(schema)["delete-field"]],
+        )
+        self.assertEqual(4, len(format_schema_commands(commands)))
+
     def tearDown(self):
         self.solr_orm.delete_fields()
         self.solr_orm.commit()
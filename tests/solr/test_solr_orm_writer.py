@@ -0,0 +1,103 @@
+# coding=utf-8
+
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+from datetime import date, datetime
+
+from datacatalog import app
+from datacatalog.models.dataset import Dataset
+from datacatalog.models.project import Project
+from datacatalog.models.study import Study
+from datacatalog.solr.solr_orm_writer import SolrIndexWriter
+from tests.base_test import BaseTest
+
+
+class TestSolrIndexWriter(BaseTest):
+    def setUp(self):
+        self.solr_orm = app.config["_solr_orm"]
+        self.solr_orm.delete_fields()
+        self.solr_orm.create_fields()
+        self.solr_orm.delete(query="*:*")
+        self.solr_orm.commit()
+
+    def test_encode(self):
+        encoded = SolrIndexWriter.encode(
+            {
+                "id": "dataset_1",
+                "dataset_title": "",
+                "dataset_keywords": ["a", None, ""],
+                "dataset_tags": [None],
+                "dataset_created": datetime(2020, 4, 30, 10, 11, 12),
+                "dataset_start": date(2020, 4, 30),
+                "dataset_version": None,
+            }
+        )
+        self.assertEqual(
+            {
+                "id": "dataset_1",
+                "dataset_keywords": ["a"],
+                "dataset_created": "2020-04-30T10:11:12Z",
+                "dataset_start": "2020-04-30T00:00:00Z",
+            },
+            json.loads(encoded),
+        )
+
+    def test_batches(self):
+        with SolrIndexWriter(self.solr_orm, batch_size=3) as writer:
+            for index in range(7):
+                Dataset(f"dataset {index}").save(writer=writer)
+            self.assertEqual(6, writer.count)
+        self.assertEqual(7, writer.count)
+        self.assertEqual(3, writer.requests_count)
+        self.assertEqual(7, Dataset.query.count())
+
+    def test_max_bytes(self):
+        dataset = Dataset("dataset")
+        size = len(SolrIndexWriter.encode(dataset.to_solr_document()))
+        with SolrIndexWriter(self.solr_orm, max_bytes=(size + 1) * 2) as writer:
+            for index in range(4):
+                Dataset("dataset").save(writer=writer)
+        self.assertEqual(2, writer.requests_count)
+
+    def test_links(self):
+        project = Project("project")
+        project.datasets = ["existing"]
+        project.save()
+        self.solr_orm.commit()
+        with SolrIndexWriter(self.solr_orm) as writer:
+            study = Study("study")
+            study.save(writer=writer)
+            for index in range(3):
+                dataset = Dataset(f"dataset {index}")
+                dataset.project = project.id
+                dataset.study = study.id
+                dataset.save(writer=writer)
+            dataset = Dataset("orphan")
+            dataset.project = "missing"
+            dataset.save(writer=writer)
+            # links are only written when the writer is closed
+            self.assertEqual(5, writer.count)
+        self.assertEqual(7, writer.count)
+        retrieved_project = Project.query.get(project.id)
+        self.assertEqual(4, len(retrieved_project.datasets))
+        self.assertEqual("existing", retrieved_project.datasets[0])
+        self.assertEqual(3, len(Study.query.get(study.id).datasets))
+        self.assertIsNone(Project.query.get("missing"))
+
+    def tearDown(self):
+        self.solr_orm.delete(query="*:*")
+        self.solr_orm.commit()
@@ -0,0 +1,104 @@
+# coding=utf-8
+
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import tempfile
+from unittest.mock import patch
+
+from datacatalog import app
+from datacatalog.models.dataset import Dataset
+from datacatalog.solr.solr_query_cache import IndexGeneration, QueryCache
+from tests.base_test import BaseTest
+
+
+class TestSolrQueryCache(BaseTest):
+    def test_lru_eviction(self):
+        cache = QueryCache(max_size=2)
+        self.assertIsNone(cache.get(1, "a"))
+        cache.set(1, "a", "value a")
+        cache.set(1, "b", "value b")
+        self.assertEqual("value a", cache.get(1, "a"))
+        cache.set(1, "c", "value c")
+        # b is the least recently used
+        self.assertIsNone(cache.get(1, "b"))
+        self.assertEqual("value a", cache.get(1, "a"))
+        self.assertEqual("value c", cache.get(1, "c"))
+        # a new generation drops all the entries
+        self.assertIsNone(cache.get(2, "a"))
+        self.assertEqual(0, cache.stats()["entries"])
+        # values computed for an older generation are not stored
+        cache.set(1, "a", "value a")
+        self.assertIsNone(cache.get(2, "a"))
+
+    def test_generation_shared_by_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "generation")
+            worker_1 = IndexGeneration(path)
+            worker_2 = IndexGeneration(path)
+            generation = worker_2.current()
+            worker_1.bump()
+            self.assertNotEqual(generation, worker_2.current())
+            generation = worker_2.current()
+            self.assertEqual(generation, worker_2.current())
+            worker_1.bump()
+            self.assertNotEqual(generation, worker_2.current())
+
+    def test_generation_max_age(self):
+        generation = IndexGeneration(None, max_age=60)
+        with patch("datacatalog.solr.solr_query_cache.time.time", return_value=120.0):
+            current = generation.current()
+        with patch("datacatalog.solr.solr_query_cache.time.time", return_value=179.0):
+            self.assertEqual(current, generation.current())
+        # commits not seen through the file are picked up after max_age seconds
+        with patch("datacatalog.solr.solr_query_cache.time.time", return_value=180.0):
+            self.assertNotEqual(current, generation.current())
+        # without max_age only the commits change the generation
+        generation = IndexGeneration(None)
+        current = generation.current()
+        with patch("datacatalog.solr.solr_query_cache.time.time", return_value=1e10):
+            self.assertEqual(current, generation.current())
+
+    def test_search_cached_until_commit(self):
+        solr_orm = app.config["_solr_orm"]
+        solr_orm.delete(query="*:*")
+        solr_orm.commit()
+        Dataset(entity_id="cached", title="first title").save(commit=True)
+        try:
+            # get goes through SolrORM.search and the select handler, not the real-time get handler
+            self.assertEqual("first title", Dataset.query.get("cached").title)
+            stats = solr_orm.query_cache.stats()
+            self.assertEqual("first title", Dataset.query.get("cached").title)
+            self.assertEqual(stats["hits"] + 1, solr_orm.query_cache.stats()["hits"])
+            # committed behind the back of the ORM, solr returns the new title
+            # but the generation didn't change and the cached response is still used
+            Dataset(entity_id="cached", title="second title").save()
+            solr_orm.indexer.commit()
+            self.assertEqual(
+                "second title",
+                solr_orm.indexer.search('id:"dataset_cached"').docs[0]["dataset_title"],
+            )
+            self.assertEqual("first title", Dataset.query.get("cached").title)
+            self.assertEqual(stats["hits"] + 2, solr_orm.query_cache.stats()["hits"])
+            # a commit through the ORM changes the generation
+            solr_orm.commit()
+            self.assertEqual("second title", Dataset.query.get("cached").title)
+            self.assertEqual(
+                stats["misses"] + 1, solr_orm.query_cache.stats()["misses"]
+            )
+        finally:
+            solr_orm.delete(query="*:*")
+            solr_orm.commit()
@@ -0,0 +1,41 @@
+# coding=utf-8
+
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from datacatalog import app
+from tests.base_test import BaseTest
+
+
+class TestSolrSession(BaseTest):
+    def setUp(self):
+        self.solr_orm = app.config["_solr_orm"]
+
+    def test_shared_session(self):
+        self.assertIs(self.solr_orm.session, self.solr_orm.indexer.get_session())
+        self.assertIs(self.solr_orm.session, self.solr_orm.indexer_schema.session)
+        self.assertEqual(self.solr_orm.session.timeout, self.solr_orm.indexer.timeout)
+
+    def test_pool_stats(self):
+        # not cached, see SolrORM.search
+        self.solr_orm.indexer.search("type:dataset", rows=0)
+        stats_before = self.solr_orm.pool_stats()
+        for _ in range(3):
+            self.solr_orm.indexer.search("type:dataset", rows=0)
+        stats = self.solr_orm.pool_stats()
+        self.assertEqual(stats_before["requests"] + 3, stats["requests"])
+        # connections are kept alive and reused
+        self.assertEqual(stats_before["connections"], stats["connections"])
+        self.assertGreaterEqual(stats["idle_connections"], 1)
@@ -14,13 +14,19 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
+from types import SimpleNamespace
+from unittest.mock import patch
 
 from flask_login import current_user
 
 from tests.base_test import BaseTest
 from datacatalog import get_access_handler, app
 from datacatalog.acces_handler.email_handler import EmailAccessHandler
+from datacatalog.acces_handler.access_handler import ApplicationState
+from datacatalog.acces_handler.rems_cache import applications_states
 from datacatalog.acces_handler.rems_handler import RemsAccessHandler
+from datacatalog.models.dataset import Dataset
+from datacatalog.models.user import User
 
 logger = logging.getLogger(__name__)
 
@@ -46,3 +52,80 @@ class TestInit(BaseTest):
 
         self.solr_orm.delete_fields()
         self.solr_orm.commit()
+
+    @patch("datacatalog.connector.rems_connector.RemsConnector.create_user")
+    def test_rems_get_access_handler_cached(self, create_user):
+        app.config["ACCESS_HANDLERS"] = {"dataset": "Rems"}
+        user = User("test", "test@test.com", "test")
+        with app.test_request_context("/"):
+            handler = get_access_handler(user, "dataset")
+            self.assertIs(handler, get_access_handler(user, "dataset"))
+            # the user is created in REMS once per session
+            create_user.assert_called_once_with("test", "test", "test@test.com")
+            self.assertIsNot(
+                handler, get_access_handler(User("other", "o@test.com", "o"), "dataset")
+            )
+            # built again once the index changed
+            app.config["_solr_orm"].commit()
+            handler = get_access_handler(user, "dataset")
+            self.assertIs(handler, get_access_handler(user, "dataset"))
+
+    @patch("datacatalog.connector.rems_connector.RemsConnector.create_user")
+    def test_rems_get_access_handler_users_alternate(self, create_user):
+        app.config["ACCESS_HANDLERS"] = {"dataset": "Rems"}
+        applications_states.clear()
+        dataset_1 = Dataset("first", entity_id="1", e2e=True)
+        dataset_2 = Dataset("second", entity_id="2", e2e=True)
+        applied = {"user1": dataset_1.id, "user2": dataset_2.id}
+        calls = []
+
+        def my_applications(**kwargs):
+            # the user is sent with each call to the shared client
+            user_id = kwargs["x_rems_user_id"]
+            calls.append(user_id)
+            return [
+                SimpleNamespace(
+                    applicationapplicant={"userid": user_id},
+                    applicationstate="application.state/approved",
+                    applicationresources=[
+                        SimpleNamespace(resourceext_id=applied[user_id])
+                    ],
+                )
+            ]
+
+        user_1 = User("user1", "user1@test.com", "user1")
+        user_2 = User("user2", "user2@test.com", "user2")
+        with patch(
+            "remsclient.ApplicationsApi.api_my_applications_get",
+            side_effect=my_applications,
+        ), app.test_request_context("/"):
+            handler_1 = get_access_handler(user_1, "dataset")
+            handler_2 = get_access_handler(user_2, "dataset")
+            self.assertIs(
+                handler_1.rems_connector.rems_client,
+                handler_2.rems_connector.rems_client,
+            )
+            self.assertIsNone(
+                getattr(
+                    handler_1.rems_connector.rems_client.configuration,
+                    "api_username",
+                    None,
+                )
+            )
+            for _ in range(2):
+                self.assertEqual(
+                    ApplicationState.approved,
+                    get_access_handler(user_1, "dataset").has_access(dataset_1),
+                )
+                self.assertFalse(
+                    get_access_handler(user_1, "dataset").has_access(dataset_2)
+                )
+                self.assertEqual(
+                    ApplicationState.approved,
+                    get_access_handler(user_2, "dataset").has_access(dataset_2),
+                )
+                self.assertFalse(
+                    get_access_handler(user_2, "dataset").has_access(dataset_1)
+                )
+                applications_states.clear()
+        self.assertEqual(["user1", "user2", "user1", "user2"], calls)
@@ -0,0 +1,96 @@
+# coding=utf-8
+
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from flask_caching import Cache
+
+from datacatalog import app
+from datacatalog.cache_tags import (
+    add_page_tags,
+    cached_page,
+    entity_tags,
+    invalidate_entities,
+    linked_entities_tags,
+)
+from datacatalog.models.dataset import Dataset
+from datacatalog.models.study import Study
+from tests.base_test import BaseTest
+
+
+class TestCacheTags(BaseTest):
+    def setUp(self):
+        self.null_cache = app.cache
+        app.cache = Cache(app, config={"CACHE_TYPE": "simple"})
+        self.calls = []
+
+    def tearDown(self):
+        app.cache = self.null_cache
+
+    def render(self, path, entity_name, entity_id=None, linked_entities=None):
+        @cached_page(tags=entity_tags)
+        def view(entity_name, entity_id=None):
+            self.calls.append((entity_name, entity_id))
+            add_page_tags(linked_entities_tags(linked_entities or []))
+            return f"{entity_name} {entity_id} {len(self.calls)}"
+
+        with app.test_request_context(path):
+            return view(entity_name=entity_name, entity_id=entity_id)
+
+    def test_invalidate_entities(self):
+        dataset_page = self.render("/e/dataset/1", "dataset", "1")
+        study_page = self.render("/e/study/1", "study", "1")
+        studies_page = self.render("/studys", "study")
+        self.assertEqual(dataset_page, self.render("/e/dataset/1", "dataset", "1"))
+        self.assertEqual(3, len(self.calls))
+
+        # a single study modified: its page and the lists of studies
+        invalidate_entities("study", ["2"])
+        self.assertEqual(study_page, self.render("/e/study/1", "study", "1"))
+        self.assertNotEqual(studies_page, self.render("/studys", "study"))
+        self.assertEqual(4, len(self.calls))
+        invalidate_entities("study", ["1"])
+        self.assertNotEqual(study_page, self.render("/e/study/1", "study", "1"))
+        self.assertEqual(5, len(self.calls))
+
+        # all the studies re-imported, the datasets pages are kept
+        invalidate_entities("study")
+        self.render("/e/study/1", "study", "1")
+        self.render("/studys", "study")
+        self.assertEqual(dataset_page, self.render("/e/dataset/1", "dataset", "1"))
+        self.assertEqual(7, len(self.calls))
+
+    def test_linked_entities_tags(self):
+        linked_entities = [Study(entity_id="1"), Dataset(entity_id="2")]
+        self.assertEqual(
+            ["dataset:2", "study:1"], linked_entities_tags(linked_entities)
+        )
+        project_page = self.render("/e/project/1", "project", "1", linked_entities)
+        self.assertEqual(
+            project_page, self.render("/e/project/1", "project", "1", linked_entities)
+        )
+        self.assertEqual(1, len(self.calls))
+        # another study modified
+        invalidate_entities("study", ["3"])
+        self.assertEqual(
+            project_page, self.render("/e/project/1", "project", "1", linked_entities)
+        )
+        self.assertEqual(1, len(self.calls))
+        # a study displayed by the project page modified
+        invalidate_entities("study", ["1"])
+        self.assertNotEqual(
+            project_page, self.render("/e/project/1", "project", "1", linked_entities)
+        )
+        self.assertEqual(2, len(self.calls))
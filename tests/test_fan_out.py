@@ -0,0 +1,53 @@
+# coding=utf-8
+
+#  DataCatalog
+#  Copyright (C) 2020  University of Luxembourg
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of the
+#  License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import time
+
+from flask import request
+
+from datacatalog import app
+from datacatalog.fan_out import fan_out
+from tests.base_test import BaseTest
+
+
+class TestFanOut(BaseTest):
+    def test_concurrent_calls(self):
+        start = time.perf_counter()
+        results = fan_out(
+            first=lambda: time.sleep(0.3) or 1, second=lambda: time.sleep(0.3) or 2
+        )
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual({"first": 1, "second": 2}, results)
+
+    def test_nested_and_errors(self):
+        def nested():
+            return fan_out(a=lambda: "a", b=lambda: "b")
+
+        def failing():
+            raise ValueError("failed")
+
+        self.assertEqual(
+            {"nested": {"a": "a", "b": "b"}, "other": None},
+            fan_out(nested=nested, other=lambda: None),
+        )
+        with self.assertRaises(ValueError):
+            fan_out(ok=lambda: 1, failing=failing)
+
+    def test_request_context(self):
+        with app.test_request_context("/e/dataset/1"):
+            results = fan_out(path=lambda: request.path, other=lambda: None)
+        self.assertEqual("/e/dataset/1", results["path"])